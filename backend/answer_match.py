@@ -0,0 +1,94 @@
+import re
+from collections import Counter
+
+# =======================================================
+# [빠른 검증] GPT 최종 답과 저가 모델 답의 일치 판정
+# =======================================================
+# 일치하면 정밀 검증과 토론을 건너뛰므로, 확실히 같은 답일 때만 True를 반환합니다.
+# 형식을 해석할 수 없거나 애매한 답은 False(정밀 검증으로 넘김)로 처리합니다.
+# - 여러 값으로 된 답("x=3, y=4", "x=3 또는 x=-3")은 괄호 밖의 쉼표/"또는"으로 나누어, 중복 횟수까지 같은지 비교합니다.
+#   ("1, 1, 2"와 "1, 2, 2"는 다른 답)
+# - 괄호로 감싼 값("(1, 2, 3)", "[0, 1)")은 순서쌍/구간이므로 괄호 종류와 성분 순서까지 같아야 합니다.
+# - 좌변은 답 전체가 "변수 = 값" 하나일 때만 생략을 허용합니다. ("x=3"과 "3"은 같고, "x=3"과 "y=3"은 다름)
+LATEX_NOISE = ("\\(", "\\)", "$$", "$", "**", "\\left", "\\right", "\\,", "\\!", "\\;")
+ANSWER_SEPARATOR = re.compile(r"\\text\{또는\}|또는")
+OPENING_BRACKETS = "([{"
+CLOSING_BRACKETS = ")]}"
+# 좌변으로 인정하는 단순 변수: x, y_1, x_{n}, \theta 등
+ANSWER_VARIABLE = re.compile(r"^(?:[a-z]|\\[a-z]+)(?:_\{?[a-z0-9]+\}?)?$")
+
+
+def normalize_answer(answer):
+    # LaTeX 구분자, 강조 표시, 공백, 끝의 마침표 차이를 무시하고 비교하기 위한 정규화입니다.
+    normalized = answer
+    for token in LATEX_NOISE:
+        normalized = normalized.replace(token, "")
+    normalized = normalized.replace("\\dfrac", "\\frac").replace("\\tfrac", "\\frac")
+    return "".join(normalized.split()).rstrip(".").lower()
+
+
+def split_top_level(text):
+    # 괄호 밖의 쉼표로만 나눕니다. 괄호 짝이 맞지 않으면 None을 반환합니다.
+    parts, depth, start = [], 0, 0
+    for position, char in enumerate(text):
+        if char in OPENING_BRACKETS:
+            depth += 1
+        elif char in CLOSING_BRACKETS:
+            depth -= 1
+            if depth < 0:
+                return None
+        elif char == "," and depth == 0:
+            parts.append(text[start:position])
+            start = position + 1
+    if depth:
+        return None
+    parts.append(text[start:])
+    return parts
+
+
+def canonical_value(value):
+    # "3", "3.0", "3.000000001"처럼 표기만 다른 숫자를 같은 문자열로 맞춥니다. 숫자가 아니면 그대로 둡니다.
+    # 괄호로 감싼 순서쌍/구간은 괄호와 성분 순서를 유지한 채 성분마다 맞춥니다. ("(1.0, 2)" -> "(1,2)")
+    if len(value) > 1 and value[0] in "([" and value[-1] in ")]":
+        items = split_top_level(value[1:-1])
+        if items is not None and len(items) > 1 and all(items):
+            return value[0] + ",".join(canonical_value(item) for item in items) + value[-1]
+    try:
+        return format(float(value), ".9g")
+    except ValueError:
+        return value
+
+
+def answer_parts(answer):
+    # 답을 (변수 또는 None, 값) 목록으로 나눕니다. 해석할 수 없으면 None을 반환합니다.
+    parts = []
+    split = split_top_level(ANSWER_SEPARATOR.sub(",", normalize_answer(answer)))
+    if split is None:
+        return None
+    for part in split:
+        if not part or part.count("=") > 1:
+            return None
+        variable, has_equals, value = part.partition("=")
+        if not has_equals:
+            parts.append((None, canonical_value(part)))
+        elif not variable or not value:
+            return None
+        elif ANSWER_VARIABLE.match(variable):
+            parts.append((variable, canonical_value(value)))
+        else:
+            # "f(x)=3x+1"처럼 좌변이 단순 변수가 아니면 식 전체를 하나의 값으로 비교합니다.
+            parts.append((None, part))
+    return parts
+
+
+def answers_match(gpt_answer, quick_answer):
+    left, right = answer_parts(gpt_answer), answer_parts(quick_answer)
+    if not left or not right:
+        return False
+    if len(left) == 1 and len(right) == 1:
+        (left_variable, left_value), (right_variable, right_value) = left[0], right[0]
+        if left_variable and right_variable and left_variable != right_variable:
+            return False
+        return left_value == right_value
+    # 여러 값으로 된 답은 변수까지 포함한 값의 중복 집합(각 값의 개수까지)이 정확히 같을 때만 일치로 봅니다.
+    return Counter(left) == Counter(right)
@@ -1,12 +1,29 @@
 import os
 import json
-import base64
-from flask import Flask, request, jsonify, render_template
-from PIL import Image
-import google.generativeai as genai
-from openai import OpenAI
+import io
+import hashlib
+import queue
+import threading
+import time
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError, as_completed
+from flask import Flask, Response, request, jsonify, render_template, stream_with_context
+from werkzeug.middleware.shared_data import SharedDataMiddleware
 from dotenv import load_dotenv
-from serpapi import GoogleSearch
+from cache import TTLCache
+from knowledge_index import KnowledgeIndex, normalize_subject
+from history_store import SessionHistoryStore
+from score_store import create_score_store, empty_scores
+from jobs import JobQueue, QueueFullError
+from stage_graph import StageGraph
+from structured_output import gemini_json_config, openai_json_format, request_structured
+from answer_match import answers_match
+from debate_state import DebateState, clip, compact_critique, compact_solution, extract_final_answer
+from image_prep import PdfPageLimitError, PdfSupportUnavailableError, preprocess_image, split_pdf_pages
+from project_settings import ProjectSettingsStore
+from providers import Providers, configure_providers, get_providers
+from upstream import ScheduledProviders, UpstreamScheduler, UpstreamUnavailableError, parse_rate_limit
+from metrics import SEARCH_PRICE, registry as metrics_registry, request_scope, track
 
 # .env 파일에서 환경 변수를 로드합니다.
 load_dotenv()
@@ -23,9 +40,134 @@ GOOGLE_API_KEY = os.environ.get("GOOGLE_API_KEY", "YOUR_GOOGLE_API_KEY")
 OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY", "YOUR_OPENAI_API_KEY")
 SERPAPI_API_KEY = os.environ.get("SERPAPI_API_KEY", "YOUR_SERPAPI_API_KEY")
 
+GPT_MODEL = "gpt-4o"
+GEMINI_MODEL = "gemini-2.5-pro"
+# 빠른 검증 단계에서 독립적인 답을 얻기 위해 사용하는 저가 모델
+FAST_VERIFY_MODEL = os.environ.get("FAST_VERIFY_MODEL", "gemini-2.5-flash")
+
 PROJECT_ID = "team_hackathon_demo"
 DB_FILE = "project_db.json"
 
+# 프로젝트별 설정 (빠른 검증 사용 여부 등). FAST_VERIFY_DEFAULT는 설정이 없는 프로젝트의 기본값입니다.
+PROJECT_SETTINGS_FILE = os.environ.get("PROJECT_SETTINGS_FILE", "project_settings.json")
+FAST_VERIFY_DEFAULT = os.environ.get("FAST_VERIFY_DEFAULT", "off")
+project_settings = ProjectSettingsStore(PROJECT_SETTINGS_FILE, defaults={"fast_verify": FAST_VERIFY_DEFAULT})
+
+# 신뢰도 점수 저장소 설정 ("sqlite" 또는 기존 방식의 "json")
+# sqlite 백엔드는 처음 시작할 때 DB_FILE의 기존 점수를 한 번 가져옵니다.
+SCORE_BACKEND = os.environ.get("SCORE_BACKEND", "sqlite")
+SCORE_DB_FILE = os.environ.get("SCORE_DB_FILE", "project_db.sqlite3")
+SCORE_READ_CACHE_TTL = float(os.environ.get("SCORE_READ_CACHE_TTL", "2"))
+score_store = create_score_store(SCORE_BACKEND, DB_FILE, SCORE_DB_FILE, read_cache_ttl=SCORE_READ_CACHE_TTL)
+
+# 지식 수집 단계의 SerpAPI 병렬 검색 설정
+SEARCH_MAX_WORKERS = int(os.environ.get("SEARCH_MAX_WORKERS", "4"))
+SEARCH_TIMEOUT = float(os.environ.get("SEARCH_TIMEOUT", "10"))
+search_executor = ThreadPoolExecutor(max_workers=SEARCH_MAX_WORKERS, thread_name_prefix="serpapi")
+
+# 업로드 이미지 전처리 설정 (긴 변 최대 픽셀, JPEG 재인코딩 품질)
+IMAGE_MAX_EDGE = int(os.environ.get("IMAGE_MAX_EDGE", "1600"))
+IMAGE_JPEG_QUALITY = int(os.environ.get("IMAGE_JPEG_QUALITY", "85"))
+
+# 파이프라인 단계 동시 실행 스레드 수 (요청당)
+PIPELINE_MAX_WORKERS = int(os.environ.get("PIPELINE_MAX_WORKERS", "4"))
+
+# 토론 압축 설정
+# 토론 라운드와 요약 프롬프트에 전달하는 비판/방어/해결책 본문의 최대 글자 수입니다. 0이면 압축하지 않고 전문을 보냅니다.
+DEBATE_CONTEXT_MAX_CHARS = int(os.environ.get("DEBATE_CONTEXT_MAX_CHARS", "2000"))
+
+# 배치 풀이(/api/solve/batch) 설정
+# BATCH_MAX_CONCURRENCY는 모든 배치 요청을 합쳐 동시에 처리되는 문제 수의 상한입니다.
+BATCH_MAX_CONCURRENCY = int(os.environ.get("BATCH_MAX_CONCURRENCY", "4"))
+BATCH_MAX_ITEMS = int(os.environ.get("BATCH_MAX_ITEMS", "30"))
+batch_slots = threading.BoundedSemaphore(BATCH_MAX_CONCURRENCY)
+
+# 토론 기록 저장소 설정
+# 모든 풀이 세션과 process 단계를 SESSION_HISTORY_FILE에 쌓고, /api/solve는 process 대신 세션 ID와 단계 수만 반환합니다.
+# 빈 값으로 두면 기록을 저장하지 않고 기존처럼 process 전체를 응답에 포함합니다.
+SESSION_HISTORY_FILE = os.environ.get("SESSION_HISTORY_FILE", "session_history.sqlite3")
+HISTORY_PAGE_SIZE = int(os.environ.get("HISTORY_PAGE_SIZE", "20"))
+HISTORY_MAX_PAGE_SIZE = int(os.environ.get("HISTORY_MAX_PAGE_SIZE", "100"))
+history_store = SessionHistoryStore(SESSION_HISTORY_FILE) if SESSION_HISTORY_FILE else None
+
+# 스트리밍 응답(SSE) 연결 유지 간격 (초)
+SSE_KEEPALIVE_INTERVAL = float(os.environ.get("SSE_KEEPALIVE_INTERVAL", "15"))
+
+# 비동기 작업 모드(/api/solve?mode=async) 설정
+JOB_CONCURRENCY = int(os.environ.get("JOB_CONCURRENCY", "2"))
+JOB_MAX_QUEUE_DEPTH = int(os.environ.get("JOB_MAX_QUEUE_DEPTH", "20"))
+
+# 프로세스 전역 모델/검색 클라이언트 설정
+# HTTP 연결 풀 크기(httpx max_connections는 넘을 수 없는 상한)는 동시에 실행될 수 있는 파이프라인 단계 수에 맞춥니다.
+# 동시에 파이프라인을 실행하는 쪽은 요청 스레드(gunicorn.conf.py와 같은 GUNICORN_THREADS), 비동기 작업, 배치 문제 슬롯입니다.
+REQUEST_THREADS = int(os.environ.get("GUNICORN_THREADS", "16"))
+HTTP_POOL_SIZE = int(os.environ.get("HTTP_POOL_SIZE", str(
+    (REQUEST_THREADS + JOB_CONCURRENCY + BATCH_MAX_CONCURRENCY) * PIPELINE_MAX_WORKERS)))
+
+# 업스트림 호출 스케줄러 설정
+# UPSTREAM_RATE_<PROVIDER>: "초당 요청 수[:버스트]" (0이면 제한 없음), UPSTREAM_DEADLINE_<PROVIDER>: 재시도를 포함한 호출당 마감 시간(초)
+UPSTREAM_RATE_LIMITS = {
+    "openai": parse_rate_limit(os.environ.get("UPSTREAM_RATE_OPENAI", "8:16")),
+    "gemini": parse_rate_limit(os.environ.get("UPSTREAM_RATE_GEMINI", "8:16")),
+    "serpapi": parse_rate_limit(os.environ.get("UPSTREAM_RATE_SERPAPI", "5:10")),
+}
+UPSTREAM_DEADLINES = {
+    "openai": float(os.environ.get("UPSTREAM_DEADLINE_OPENAI", "180")),
+    "gemini": float(os.environ.get("UPSTREAM_DEADLINE_GEMINI", "180")),
+    "serpapi": SEARCH_TIMEOUT,
+}
+UPSTREAM_MAX_RETRIES = int(os.environ.get("UPSTREAM_MAX_RETRIES", "3"))
+UPSTREAM_BACKOFF_BASE = float(os.environ.get("UPSTREAM_BACKOFF_BASE", "0.5"))
+UPSTREAM_BACKOFF_MAX = float(os.environ.get("UPSTREAM_BACKOFF_MAX", "8"))
+upstream_scheduler = UpstreamScheduler(
+    UPSTREAM_RATE_LIMITS,
+    UPSTREAM_DEADLINES,
+    max_retries=UPSTREAM_MAX_RETRIES,
+    backoff_base=UPSTREAM_BACKOFF_BASE,
+    backoff_max=UPSTREAM_BACKOFF_MAX,
+)
+configure_providers(lambda: ScheduledProviders(Providers(
+    openai_api_key=OPENAI_API_KEY,
+    google_api_key=GOOGLE_API_KEY,
+    serpapi_api_key=SERPAPI_API_KEY,
+    pool_size=HTTP_POOL_SIZE,
+), upstream_scheduler))
+
+# 운영 서버(gunicorn 등) 설정
+# WARM_UP: 워커 시작 시 프로바이더 SDK 임포트와 클라이언트 생성을 미리 할지 여부
+#   "background"(기본값) 백그라운드 스레드에서 수행, "sync" 완료 후 요청 수신, "off" 첫 요청 때 생성
+# STATIC_MAX_AGE: /static 자산의 Cache-Control max-age(초). 자산은 Flask 라우팅 전에 WSGI 미들웨어가 직접 제공합니다.
+WARM_UP = os.environ.get("WARM_UP", "background")
+STATIC_MAX_AGE = int(os.environ.get("STATIC_MAX_AGE", str(24 * 3600)))
+
+# 주제별 지식 패키지 캐시 설정 (Step 2-3 결과 재사용)
+KNOWLEDGE_CACHE_FILE = os.environ.get("KNOWLEDGE_CACHE_FILE", "knowledge_cache.json")
+KNOWLEDGE_CACHE_MAX_ENTRIES = int(os.environ.get("KNOWLEDGE_CACHE_MAX_ENTRIES", "128"))
+KNOWLEDGE_CACHE_TTL = int(os.environ.get("KNOWLEDGE_CACHE_TTL", str(7 * 24 * 3600)))
+knowledge_cache = TTLCache(
+    max_entries=KNOWLEDGE_CACHE_MAX_ENTRIES,
+    ttl_seconds=KNOWLEDGE_CACHE_TTL,
+    persist_path=KNOWLEDGE_CACHE_FILE,
+)
+
+# 로컬 지식 인덱스 설정 (Step 2에서 검색어마다 SerpAPI보다 먼저 조회)
+# 인덱스 결과가 KNOWLEDGE_INDEX_MIN_HITS개 미만인 검색어만 SerpAPI로 검색하고, 그 결과는 다시 인덱스에 쌓입니다.
+# KNOWLEDGE_INDEX_FILE을 빈 값으로 두면 인덱스를 사용하지 않고 항상 SerpAPI를 호출합니다.
+KNOWLEDGE_INDEX_FILE = os.environ.get("KNOWLEDGE_INDEX_FILE", "knowledge_index.sqlite3")
+KNOWLEDGE_INDEX_MIN_HITS = int(os.environ.get("KNOWLEDGE_INDEX_MIN_HITS", "2"))
+knowledge_index = KnowledgeIndex(KNOWLEDGE_INDEX_FILE) if KNOWLEDGE_INDEX_FILE else None
+
+# 동일 이미지 + 질문 재제출 시 전체 결과를 재사용하는 결과 캐시 설정
+# 결과에는 process 전문이 들어 있어 파일이 커지므로 기본값은 메모리 전용입니다. RESULT_CACHE_FILE을 지정하면 파일로도 저장합니다.
+RESULT_CACHE_FILE = os.environ.get("RESULT_CACHE_FILE", "")
+RESULT_CACHE_MAX_ENTRIES = int(os.environ.get("RESULT_CACHE_MAX_ENTRIES", "256"))
+RESULT_CACHE_TTL = int(os.environ.get("RESULT_CACHE_TTL", str(24 * 3600)))
+result_cache = TTLCache(
+    max_entries=RESULT_CACHE_MAX_ENTRIES,
+    ttl_seconds=RESULT_CACHE_TTL,
+    persist_path=RESULT_CACHE_FILE,
+)
+
 # =======================================================
 # [Prompt Engineering] System Prompts (Korean)
 # =======================================================
@@ -117,9 +259,11 @@ PROMPT_VERIFIER_INIT = """
 3.  **수식 서식:** 당신의 답변에 포함된 모든 수학적 표기법은 LaTeX를 사용하여 포맷하세요. **반드시** 인라인 수식은 `\\(...\\)`로, 블록 수식은 `$$...$$`로 묶어주세요. **절대로 `\[...\]`를 사용하지 마세요.**
 **매우 중요:** 최종 답이 명백히 틀렸거나, 풀이 과정에 치명적인 논리적/계산 오류가 있는 경우에만 '오류'로 판정하세요. 사소한 표현 차이나 스타일은 문제 삼지 마세요.
 
-**출력 규칙 (엄격히 준수):**
-- **정답인 경우:** 당신의 방식으로 문제를 다시 풀어보고, 그 풀이 과정 끝에 "따라서 모델 01의 답변이 올바릅니다."라고 결론을 내리세요.
-- **오류가 있는 경우:** "모델 01의 해결책에는 다음과 같은 오류가 있습니다." 라는 문장으로 시작하여, 구체적인 비판과 함께 올바른 해결책을 `## 올바른 해결책`이라는 제목 아래에 제시하세요.
+**출력 규칙 (JSON 객체, 엄격히 준수):**
+- `verdict`: 정답이면 "correct", 오류가 있으면 "incorrect".
+- `analysis`: **정답인 경우** 당신의 방식으로 문제를 다시 풀어본 풀이 과정, **오류가 있는 경우** 구체적인 비판.
+- `corrected_solution`: 오류가 있는 경우 올바른 전체 해결책. 정답인 경우 빈 문자열.
+- `final_answer`: 당신이 확인하거나 제시하는 최종 답만 간단히.
 """
 
 PROMPT_SOLVER_DEFENSE = """
@@ -127,8 +271,11 @@ PROMPT_SOLVER_DEFENSE = """
 **임무:**
 1.  감사관의 비판을 신중하게 검토하세요.
 2.  **수식 서식:** 당신의 답변에 포함된 모든 수학적 표기법은 LaTeX를 사용하여 포맷하세요. **반드시** 인라인 수식은 `\\(...\\)`로, 블록 수식은 `$$...$$`로 묶어주세요. **절대로 `\[...\]`를 사용하지 마세요.**
-3.  **자기 수정:** 비판이 옳다면, "검토 결과, 제 해결책에 오류가 있었음을 인정합니다."로 시작하여 오류의 원인을 설명한 후, 수정된 전체 풀이 과정과 답을 제시하세요.
-4.  **방어:** 비판이 틀렸다고 확신한다면, 당신의 입장을 방어하세요. 왜 당신의 원래 논리와 출처가 정확한지 설명하는 내용만 제시하세요.
+3.  **자기 수정:** 비판이 옳다면, `decision`을 "concede"로 하고 `response`에 오류의 원인을 설명한 후, 수정된 전체 풀이 과정과 답을 제시하세요.
+4.  **방어:** 비판이 틀렸다고 확신한다면, `decision`을 "defend"로 하고 `response`에 당신의 입장을 방어하세요. 왜 당신의 원래 논리와 출처가 정확한지 설명하는 내용만 제시하세요.
+5.  `final_answer`에는 지금 당신이 옳다고 보는 최종 답만 간단히 쓰세요.
+
+**출력 형식:** `decision`, `response`, `final_answer` 필드를 가진 JSON 객체
 """
 
 PROMPT_VERIFIER_REBUTTAL = """
@@ -136,10 +283,23 @@ PROMPT_VERIFIER_REBUTTAL = """
 **수식 서식:** 당신의 답변에 포함된 모든 수학적 표기법은 LaTeX를 사용하여 포맷하세요. **반드시** 인라인 수식은 `\\(...\\)`로, 블록 수식은 `$$...$$`로 묶어주세요. **절대로 `\[...\]`를 사용하지 마세요.**
 **최종 정확성 우선:** 당신의 목표는 최종적으로 가장 정확한 해결책을 찾는 것입니다. 해결사의 반박이 합리적이고 증거에 기반한다면, 당신의 이전 지적이 잘못되었음을 인정하는 것을 주저하지 마세요.
 
-**출력 규칙:**
-- 만약 그들이 문제를 인정하고 올바르게 수정했다면: "해결사의 수정을 검토한 결과, 이제 해결책이 정확함을 확인했습니다." 라는 문장으로 시작하세요.
-- 만약 그들이 반박했고 당신이 이제 설득되었다면: "해결사의 반박을 검토한 결과, 제 지적이 틀렸으며 해결사의 원래 주장이 옳았음을 인정합니다." 라는 문장으로 시작하세요.
-- 만약 그들이 여전히 틀렸다면: "해결사의 반박에도 불구하고, 여전히 원래 해결책에는 오류가 있습니다. 최종적으로 올바른 해결책은 다음과 같습니다." 라는 문장으로 시작하여 당신의 최종 해결책을 제시하세요.
+**출력 규칙 (JSON 객체):**
+- `decision`:
+  - 만약 그들이 문제를 인정하고 올바르게 수정하여 이제 해결책이 정확하다면: "accept_fix"
+  - 만약 그들이 반박했고 당신이 이제 설득되어 당신의 지적이 틀렸음을 인정한다면: "concede"
+  - 만약 그들이 여전히 틀렸다면: "maintain"
+- `response`: 판단의 근거.
+- `corrected_solution`: "maintain"인 경우 당신의 최종 해결책. 그 외에는 빈 문자열.
+- `final_answer`: 당신이 옳다고 보는 최종 답만 간단히.
+"""
+
+# Fast verification tier: an independent, answer-only solve by a cheaper model (Korean)
+PROMPT_QUICK_ANSWER = """
+당신은 빠르고 정확한 채점 보조원입니다. 이미지의 문제를 풀고 **최종 답만** 출력하세요.
+**규칙:**
+- 풀이 과정, 설명, 출처를 쓰지 마세요.
+- 수식은 LaTeX 없이 가능한 한 간단한 형태로 쓰세요. (예: -2, x = 3, 1/2)
+- 답이 여러 개이면 쉼표로 구분하세요.
 """
 
 # =======================================================
@@ -165,7 +325,6 @@ PROMPT_DEBATE_SUMMARY = """
 - 반드시 다음의 JSON 형식을 사용하세요.
 - 각 항목에 대해 3가지 포인트가 없는 경우, 가능한 만큼만 채우고 나머지는 비워두세요.
 
-```json
 {{
   "calculation_summary": "요약 내용...",
   "gpt_errors": [
@@ -179,7 +338,6 @@ PROMPT_DEBATE_SUMMARY = """
     "검증 근거 3"
   ]
 }}
-```
 """
 
 PROMPT_DEBATE_CONCLUSION = """
@@ -193,48 +351,210 @@ PROMPT_DEBATE_CONCLUSION = """
 초기 GPT 답변에서 몇 가지 오류가 발견되었으나, Gemini의 정밀한 교차검증을 통해 이를 바로잡았습니다. 최종적으로 Gemini가 제시한 수정된 해결책이 더 정확한 것으로 판명되어 최종 답안으로 채택되었습니다.
 """
 
+# =======================================================
+# [Prompt Engineering] Structured Output Schemas
+# =======================================================
+# 검증/방어/재평가/지식 패키지/토론 요약 단계는 JSON 모드로 아래 스키마에 맞는 객체를 받습니다.
+# 토론 흐름은 문구 포함 여부가 아니라 verdict/decision 필드로 결정됩니다.
+def _string_list():
+    return {"type": "array", "items": {"type": "string"}}
+
+VERIFICATION_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "verdict": {"type": "string", "enum": ["correct", "incorrect"]},
+        "analysis": {"type": "string"},
+        "corrected_solution": {"type": "string"},
+        "final_answer": {"type": "string"},
+    },
+    "required": ["verdict", "analysis", "corrected_solution", "final_answer"],
+}
+
+DEFENSE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "decision": {"type": "string", "enum": ["concede", "defend"]},
+        "response": {"type": "string"},
+        "final_answer": {"type": "string"},
+    },
+    "required": ["decision", "response", "final_answer"],
+}
+
+REBUTTAL_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "decision": {"type": "string", "enum": ["accept_fix", "concede", "maintain"]},
+        "response": {"type": "string"},
+        "corrected_solution": {"type": "string"},
+        "final_answer": {"type": "string"},
+    },
+    "required": ["decision", "response", "corrected_solution", "final_answer"],
+}
+
+KNOWLEDGE_PACKAGE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "field": {"type": "string"},
+        "symbols": _string_list(),
+        "formulas": _string_list(),
+        "definitions": _string_list(),
+        "examples": _string_list(),
+        "context_text": {"type": "string"},
+    },
+    "required": ["field", "symbols", "formulas", "definitions", "examples", "context_text"],
+}
+
+DEBATE_SUMMARY_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "calculation_summary": {"type": "string"},
+        "gpt_errors": _string_list(),
+        "gemini_verification": _string_list(),
+    },
+    "required": ["calculation_summary", "gpt_errors", "gemini_verification"],
+}
+
 # =======================================================
 # [함수] 데이터베이스 및 유틸리티
 # =======================================================
 def load_project_scores(project_id):
-    if not os.path.exists(DB_FILE): return {"GPT": 0, "Gemini": 0}
     try:
-        with open(DB_FILE, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            return data.get(project_id, {"GPT": 0, "Gemini": 0})
-    except: return {"GPT": 0, "Gemini": 0}
-
-def save_project_scores(project_id, scores):
-    data = {}
-    if os.path.exists(DB_FILE):
-        try:
-            with open(DB_FILE, "r", encoding="utf-8") as f: data = json.load(f)
-        except: pass
-    data[project_id] = scores
-    with open(DB_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=4, ensure_ascii=False)
+        return score_store.get(project_id)
+    except Exception as e:
+        print(f"Error loading project scores: {e}")
+        return empty_scores()
+
+def add_project_scores(project_id, score_deltas):
+    # 점수 변화량을 원자적으로 더하고, 갱신된 전체 점수를 반환합니다.
+    return score_store.increment(project_id, score_deltas)
+
+class StatusLog(list):
+    # 토론 과정 로그(process)입니다. 항목이 추가될 때마다 on_update 콜백으로 즉시 전달합니다.
+    # offsets에는 항목별로 로그 생성 후 경과 시간(초)을 기록하여 토론 기록 저장소에 함께 남깁니다.
+    def __init__(self, on_update=None):
+        super().__init__()
+        self.on_update = on_update
+        self.started = time.monotonic()
+        self.offsets = []
+
+    def append(self, update):
+        super().append(update)
+        self.offsets.append(round(time.monotonic() - self.started, 3))
+        if self.on_update:
+            self.on_update(update)
+
+    def extend(self, updates):
+        for update in updates:
+            self.append(update)
+
+def record_session(project_id, user_question, result, step_offsets=None):
+    # 풀이 결과를 토론 기록 저장소에 추가하고 세션 ID를 반환합니다. 저장에 실패해도 풀이 응답은 그대로 반환합니다.
+    if history_store is None:
+        return None
+    try:
+        return history_store.append(project_id, user_question, result, step_offsets)
+    except Exception as e:
+        print(f"Error recording session history: {e}")
+        return None
+
+def compact_result(result):
+    # 세션이 저장된 경우 process 전문 대신 단계 수와 단계 조회 URL만 응답에 담습니다.
+    if not result.get("session_id"):
+        return result
+    compact = {key: value for key, value in result.items() if key != "process"}
+    compact["step_count"] = len(result.get("process") or [])
+    compact["steps_url"] = f"/api/sessions/{result['session_id']}/steps"
+    return compact
+
+def submit_with_context(executor, fn, *args):
+    # 요청별 계측 컨텍스트(contextvars)가 작업 스레드에서도 유지되도록 컨텍스트를 복사해 실행합니다.
+    return executor.submit(contextvars.copy_context().run, fn, *args)
+
+def format_search_results(results):
+    snippets = []
+    for result in results[:3]:
+        snippet = result.get("snippet", "No snippet available.")
+        link = result.get("link", "#")
+        snippets.append(f"Title: {result.get('title', 'N/A')}\nSnippet: {snippet}\nSource: {link}")
+    return "\n".join(snippets) if snippets else "검색 결과가 없습니다."
+
+def search_knowledge_index(query, subject=None):
+    # 로컬 인덱스 결과가 충분하면 SerpAPI 결과와 같은 형식의 문자열을, 부족하면 None을 반환합니다.
+    # subject(정규화된 주제)가 주어지면 같은 주제의 문서만 결과로 인정합니다.
+    if knowledge_index is None:
+        return None
+    try:
+        with track("search", "knowledge_index", query=query):
+            hits = knowledge_index.search(query, limit=3, subject=subject)
+    except Exception as e:
+        print(f"Error searching knowledge index: {e}")
+        return None
+    outcome = "hit" if hits and len(hits) >= KNOWLEDGE_INDEX_MIN_HITS else "miss"
+    metrics_registry.increment("gempt_knowledge_index_total", {"outcome": outcome})
+    return format_search_results(hits) if outcome == "hit" else None
 
-def perform_google_search(query):
+def perform_google_search(query, subject=""):
     try:
-        search = GoogleSearch({"q": query, "api_key": SERPAPI_API_KEY})
-        results = search.get_dict()
+        with track("search", "serpapi", query=query) as call:
+            results = get_providers().google_search(query, timeout=SEARCH_TIMEOUT)
+            call.cost = 0.0 if call.shared_response() else SEARCH_PRICE
         
         if "error" in results:
             return f"Search Error: {results['error']}"
 
-        snippets = []
-        if "organic_results" in results:
-            for result in results["organic_results"][:3]:
-                snippet = result.get("snippet", "No snippet available.")
-                link = result.get("link", "#")
-                snippets.append(f"Title: {result.get('title', 'N/A')}\nSnippet: {snippet}\nSource: {link}")
-        
-        return "\n".join(snippets) if snippets else "검색 결과가 없습니다."
+        organic_results = results.get("organic_results", [])
+        if knowledge_index is not None and organic_results:
+            # 프롬프트에는 상위 3개만 넣지만, 인덱스에는 받은 결과를 모두 쌓아 다음 검색에 재사용합니다.
+            try:
+                knowledge_index.add(organic_results, subject=subject)
+            except Exception as e:
+                print(f"Error updating knowledge index: {e}")
+        return format_search_results(organic_results)
     except Exception as e:
         print(f"Error during Google Search: {e}")
         return f"검색 중 예외 발생: {str(e)}"
 
-def format_final_summary(gemini_model, a01, r02, final_answer, winner, is_correct):
+def perform_google_searches(queries, subject=""):
+    # 모든 검색어를 스레드 풀에 동시에 제출하고, 결과는 원래 순서대로 반환합니다.
+    # 각 검색어는 풀에서 실행을 시작한 시점부터 SEARCH_TIMEOUT 안에 끝나야 하며, 느린 검색어가 다른 결과를 막지 않습니다.
+    # 풀은 모든 요청이 함께 쓰므로, 다른 요청의 검색이 풀을 차지해 기다린 시간은 제한 시간에 넣지 않습니다.
+    started_at = {}
+    started = [threading.Event() for _ in queries]
+
+    def run(index, query):
+        started_at[index] = time.monotonic()
+        started[index].set()
+        return perform_google_search(query, subject)
+
+    futures = [submit_with_context(search_executor, run, index, query) for index, query in enumerate(queries)]
+
+    results = []
+    for index, (query, future) in enumerate(zip(queries, futures)):
+        try:
+            # 앞선 검색은 각자 SEARCH_TIMEOUT으로 끝나므로 대기 중인 검색어도 결국 실행을 시작합니다.
+            started[index].wait()
+            results.append(future.result(timeout=max(0.0, started_at[index] + SEARCH_TIMEOUT - time.monotonic())))
+        except FutureTimeoutError:
+            future.cancel()
+            print(f"Google Search timed out: {query}")
+            results.append(f"검색 중 예외 발생: {SEARCH_TIMEOUT}초 내에 응답이 없습니다.")
+        except Exception as e:
+            print(f"Error during Google Search: {e}")
+            results.append(f"검색 중 예외 발생: {str(e)}")
+    return results
+
+def make_result_cache_key(image_bytes, user_question, fast_verify_mode="off"):
+    # 이미지 바이트의 해시와 정규화된 질문으로 콘텐츠 주소 키를 만듭니다.
+    # 빠른 검증으로 정밀 검증을 건너뛴 결과가 정밀 검증을 요청한 프로젝트에 재사용되지 않도록 검증 단계도 키에 넣습니다.
+    normalized_question = " ".join(user_question.split())
+    digest = hashlib.sha256(image_bytes)
+    digest.update(b"\0")
+    digest.update(normalized_question.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(fast_verify_mode.encode("utf-8"))
+    return digest.hexdigest()
+
+def generate_debate_summary(gemini_model, a01, r02, is_correct):
     summary_data = {
         "calculation_summary": "해당 없음",
         "gpt_errors": ["오류가 발견되지 않았습니다."],
@@ -244,17 +564,20 @@ def format_final_summary(gemini_model, a01, r02, final_answer, winner, is_correc
     if not is_correct:
         try:
             # 토론 요약 (계산 근거, 오류 포인트, 검증 근거)
-            summary_prompt = PROMPT_DEBATE_SUMMARY.format(a01=a01, r02=r02)
-            summary_response = gemini_model.generate_content([summary_prompt])
-            
-            # 응답에서 JSON 부분만 추출
-            cleaned_json_string = summary_response.text.strip()
-            if cleaned_json_string.startswith("```json"):
-                cleaned_json_string = cleaned_json_string[len("```json"):].strip()
-            if cleaned_json_string.endswith("```"):
-                cleaned_json_string = cleaned_json_string[:-len("```")].strip()
-            
-            summary_json = json.loads(cleaned_json_string)
+            # 전문 대신 출처를 뺀 풀이 요지와 비판 요지만 전달합니다.
+            summary_prompt = PROMPT_DEBATE_SUMMARY.format(
+                a01=compact_solution(a01, DEBATE_CONTEXT_MAX_CHARS),
+                r02=compact_critique(r02, DEBATE_CONTEXT_MAX_CHARS))
+            def invoke():
+                with track("summary", "gemini", GEMINI_MODEL) as call:
+                    summary_response = gemini_model.generate_content(
+                        [summary_prompt], generation_config=gemini_json_config(DEBATE_SUMMARY_SCHEMA))
+                    call.record_usage(summary_response)
+                return summary_response.text
+
+            summary_json, _ = request_structured("summary", invoke, DEBATE_SUMMARY_SCHEMA)
+            if summary_json is None:
+                raise ValueError("summary response did not match the schema")
             summary_data.update(summary_json)
         except Exception as e:
             print(f"Error generating debate summary: {e}")
@@ -262,17 +585,22 @@ def format_final_summary(gemini_model, a01, r02, final_answer, winner, is_correc
             summary_data['gpt_errors'] = ["Gemini의 검증 내용에서 오류 포인트를 추출하는 데 실패했습니다."]
             summary_data['gemini_verification'] = [r02]
 
+    return summary_data
 
+def generate_conclusion_summary(gemini_model, winner, final_answer):
     # 최종 결론 요약
-    conclusion_summary = ""
     try:
-        conclusion_prompt = PROMPT_DEBATE_CONCLUSION.format(winner=winner, final_answer=final_answer)
-        conclusion_response = gemini_model.generate_content([conclusion_prompt])
-        conclusion_summary = conclusion_response.text.strip()
+        conclusion_prompt = PROMPT_DEBATE_CONCLUSION.format(
+            winner=winner, final_answer=clip(final_answer, DEBATE_CONTEXT_MAX_CHARS))
+        with track("conclusion", "gemini", GEMINI_MODEL) as call:
+            conclusion_response = gemini_model.generate_content([conclusion_prompt])
+            call.record_usage(conclusion_response)
+        return conclusion_response.text.strip()
     except Exception as e:
         print(f"Error generating conclusion summary: {e}")
-        conclusion_summary = "최종 결론을 요약하는 데 실패했습니다."
+        return "최종 결론을 요약하는 데 실패했습니다."
 
+def format_final_summary(final_answer, summary_data, conclusion_summary):
     # 최종 텍스트 포맷팅
     gpt_errors_formatted = "\n- ".join(summary_data.get('gpt_errors', ['추출 실패']))
     gemini_verification_formatted = "\n- ".join(summary_data.get('gemini_verification', ['추출 실패']))
@@ -298,76 +626,226 @@ def format_final_summary(gemini_model, a01, r02, final_answer, winner, is_correc
 # =======================================================
 # [Core Logic] AI Analysis and Debate Process (New Pipeline)
 # =======================================================
-def run_analysis_logic(project_id, image_file, user_question):
-    genai.configure(api_key=GOOGLE_API_KEY)
-    client_gpt = OpenAI(api_key=OPENAI_API_KEY)
-    gemini_model = genai.GenerativeModel('gemini-2.5-pro')
-    
-    credit_scores = load_project_scores(project_id)
-    status_updates = []
-    
-    image_file.seek(0)
-    pil_image = Image.open(image_file)
-
+def classify_subject(gemini_model, image_part, user_question, status_updates):
     # === Step 1: Subject Classification ===
-    subject_response = gemini_model.generate_content(
-        [PROMPT_SUBJECT_CLASSIFIER, user_question, pil_image]
-    )
+    with track("classification", "gemini", GEMINI_MODEL) as call:
+        subject_response = gemini_model.generate_content(
+            [PROMPT_SUBJECT_CLASSIFIER, user_question, image_part]
+        )
+        call.record_usage(subject_response)
     subject = subject_response.text.strip()
     status_updates.append({"model": "System", "content": f"인식된 주제: {subject}", "step": "주제 분류"})
+    return subject
+
+def build_knowledge_package(gemini_model, subject, status_updates):
+    subject_key = normalize_subject(subject)
+    cached_package = knowledge_cache.get(subject_key)
+
+    if cached_package is not None:
+        # 캐시 적중: 검색어 생성, SerpAPI 검색, 패키지 생성을 건너뛰고 Step 4로 바로 진행합니다.
+        knowledge_package_str = json.dumps(cached_package, ensure_ascii=False, indent=2)
+        status_updates.append({"model": "System", "content": f"'{subject}' 주제의 캐시된 지식 패키지를 사용합니다.", "step": "지식 수집"})
+        status_updates.append({"model": "System", "content": knowledge_package_str, "step": "지식 패키지 생성"})
+        return knowledge_package_str
 
     # === Step 2: Knowledge Crawling ===
     queries_prompt = PROMPT_KNOWLEDGE_CRAWLER_QUERIES.format(subject=subject)
-    queries_response = gemini_model.generate_content([queries_prompt])
+    with track("query_generation", "gemini", GEMINI_MODEL) as call:
+        queries_response = gemini_model.generate_content([queries_prompt])
+        call.record_usage(queries_response)
     search_queries = queries_response.text.strip().split('\n')
-    
+
     raw_search_results = ""
     crawling_content = "생성된 검색어:\n" + "\n".join(search_queries) + "\n\n--- 검색 결과 ---\n"
-    for query in search_queries:
-        if query:
-            results = perform_google_search(query)
-            raw_search_results += f"'{query}'에 대한 결과:\n{results}\n\n"
-    
+    non_empty_queries = [query for query in search_queries if query]
+    # 로컬 지식 인덱스를 먼저 조회하고, 결과가 부족한 검색어만 SerpAPI로 검색합니다.
+    search_results = {query: search_knowledge_index(query, subject=subject_key) for query in non_empty_queries}
+    missing_queries = [query for query, results in search_results.items() if results is None]
+    search_results.update(zip(missing_queries, perform_google_searches(missing_queries, subject=subject)))
+    for query in non_empty_queries:
+        source = "웹 검색" if query in missing_queries else "로컬 지식 인덱스"
+        raw_search_results += f"'{query}'에 대한 결과 ({source}):\n{search_results[query]}\n\n"
+
     crawling_content += raw_search_results
     status_updates.append({"model": "System", "content": crawling_content, "step": "지식 수집"})
 
     # === Step 3: Knowledge Package Generation ===
     package_prompt = PROMPT_KNOWLEDGE_PACKAGE_GENERATOR.format(subject=subject, search_results=raw_search_results)
-    package_response = gemini_model.generate_content([package_prompt])
-    cleaned_json_string = package_response.text.strip().replace("```json", "").replace("```", "")
-    knowledge_package_str = cleaned_json_string
+    def invoke():
+        with track("package_generation", "gemini", GEMINI_MODEL) as call:
+            package_response = gemini_model.generate_content(
+                [package_prompt], generation_config=gemini_json_config(KNOWLEDGE_PACKAGE_SCHEMA))
+            call.record_usage(package_response)
+        return package_response.text
+
+    package, raw_package = request_structured("package_generation", invoke, KNOWLEDGE_PACKAGE_SCHEMA)
+    if package is not None:
+        knowledge_package_str = json.dumps(package, ensure_ascii=False, indent=2)
+        # 스키마 검증을 통과한 패키지만 캐시에 저장합니다. (실패 시 다음 요청에서 다시 생성)
+        knowledge_cache.set(subject_key, package)
+    else:
+        print("Knowledge package did not match the schema, skipping cache")
+        knowledge_package_str = (raw_package or "").strip()
     status_updates.append({"model": "System", "content": knowledge_package_str, "step": "지식 패키지 생성"})
+    return knowledge_package_str
 
+def solve_initial(client_gpt, knowledge_package_str, user_question, image_data_url, status_updates):
     # === Step 4: GPT Initial Solution with Knowledge Injection ===
-    image_file.seek(0)
-    base64_image = base64.b64encode(image_file.read()).decode('utf-8')
     solver_prompt = PROMPT_SOLVER_INIT.format(knowledge_package=knowledge_package_str)
     
-    response_01 = client_gpt.chat.completions.create(
-        model="gpt-4o",
-        messages=[
-            {"role": "system", "content": solver_prompt},
-            {"role": "user", "content": [
-                {"type": "text", "text": user_question},
-                {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{base64_image}"}}
-            ]}
-        ]
-    )
+    with track("gpt_solve", "openai", GPT_MODEL) as call:
+        response_01 = client_gpt.chat.completions.create(
+            model=GPT_MODEL,
+            messages=[
+                {"role": "system", "content": solver_prompt},
+                {"role": "user", "content": [
+                    {"type": "text", "text": user_question},
+                    {"type": "image_url", "image_url": {"url": image_data_url}}
+                ]}
+            ]
+        )
+        call.record_usage(response_01)
     a01 = response_01.choices[0].message.content
     status_updates.append({"model": "GPT", "content": a01, "step": "초기 해결책"})
-
+    return a01
+
+def with_final_answer(solution, final_answer):
+    # 구조화 응답의 final_answer를 "### 최종 답변" 제목으로 붙여, 토론 상태가 양측의 답을 추출할 수 있게 합니다.
+    if not final_answer or extract_final_answer(solution) is not None:
+        return solution
+    return f"{solution}\n\n### 최종 답변\n{final_answer}"
+
+def render_verification(data):
+    # 검증 결과(JSON)를 process와 토론에 쓰는 기존 형식의 텍스트로 바꿉니다.
+    if data["verdict"] == "correct":
+        return f"{data['analysis'].strip()}\n\n따라서 모델 01의 답변이 올바릅니다."
+    return (f"모델 01의 해결책에는 다음과 같은 오류가 있습니다. {data['analysis'].strip()}\n\n"
+            f"## 올바른 해결책\n{with_final_answer(data['corrected_solution'].strip(), data['final_answer'])}")
+
+def verify_solution(gemini_model, user_question, a01, image_part, status_updates):
     # === Step 5: Gemini Verification ===
-    image_file.seek(0)
-    pil_image_verify = Image.open(image_file)
-    response_02 = gemini_model.generate_content(
-        [PROMPT_VERIFIER_INIT, f"사용자 질문: {user_question}\n\n모델 01 해결책:\n{a01}", pil_image_verify]
-    )
-    r02 = response_02.text
-    status_updates.append({"model": "Gemini", "content": r02, "step": "검증"})
-    
-    is_correct = "따라서 모델 01의 답변이 올바릅니다." in r02
-    
+    # 반환값: {"is_correct": 검증 통과 여부, "text": process에 기록되는 검증 내용(r02)}
+    def invoke():
+        with track("verification", "gemini", GEMINI_MODEL) as call:
+            response_02 = gemini_model.generate_content(
+                [PROMPT_VERIFIER_INIT, f"사용자 질문: {user_question}\n\n모델 01 해결책:\n{a01}", image_part],
+                generation_config=gemini_json_config(VERIFICATION_SCHEMA)
+            )
+            call.record_usage(response_02)
+        return response_02.text
+
+    data, raw_r02 = request_structured("verification", invoke, VERIFICATION_SCHEMA)
+    if data is not None:
+        verification = {"is_correct": data["verdict"] == "correct", "text": render_verification(data)}
+    else:
+        # 두 번 모두 스키마에 맞지 않으면 기존 문구 판정으로 대신합니다.
+        r02 = raw_r02 or ""
+        verification = {"is_correct": "따라서 모델 01의 답변이 올바릅니다." in r02, "text": r02}
+    status_updates.append({"model": "Gemini", "content": verification["text"], "step": "검증"})
+    return verification
+
+def generate_quick_answer(gemini_model, image_part, user_question):
+    # 빠른 검증 단계: 저가 모델이 GPT와 독립적으로 최종 답만 구합니다. 실패 시 None을 반환하고 정밀 검증으로 넘어갑니다.
+    try:
+        with track("fast_verification", "gemini", FAST_VERIFY_MODEL) as call:
+            response = gemini_model.generate_content([PROMPT_QUICK_ANSWER, user_question, image_part])
+            call.record_usage(response)
+        return response.text.strip()
+    except Exception as e:
+        print(f"Error generating quick answer: {e}")
+        return None
+
+def fast_verify(a01, quick_answer, status_updates):
+    # GPT 최종 답과 빠른 답이 일치하면 정밀 검증을 대신할 검증 결과를 반환하고, 아니면 None을 반환합니다.
+    gpt_answer = extract_final_answer(a01)
+    if quick_answer is None or gpt_answer is None:
+        outcome = "skipped"
+    elif answers_match(gpt_answer, quick_answer):
+        outcome = "short_circuit"
+    else:
+        outcome = "escalated"
+    metrics_registry.increment("gempt_fast_verify_total", {"outcome": outcome})
+
+    if outcome != "short_circuit":
+        if outcome == "escalated":
+            status_updates.append({"model": "System", "content": f"빠른 검증 답변({quick_answer})이 GPT 최종 답변({gpt_answer})과 달라 정밀 검증을 진행합니다.", "step": "빠른 검증"})
+        return None
+
+    r02 = f"빠른 검증 결과, 독립적으로 구한 답({quick_answer})이 GPT의 최종 답변({gpt_answer})과 일치합니다. 따라서 모델 01의 답변이 올바릅니다."
+    status_updates.append({"model": "Gemini", "content": r02, "step": "빠른 검증"})
+    return {"is_correct": True, "text": r02}
+
+def record_debate_round(call):
+    # 라운드별 프롬프트 토큰 수를 누적하여 /metrics에서 압축 효과를 확인할 수 있게 합니다.
+    labels = {"stage": call.stage, "round": str(call.details["round"])}
+    metrics_registry.increment("gempt_debate_round_calls_total", labels)
+    metrics_registry.increment("gempt_debate_round_prompt_tokens_total", labels, call.prompt_tokens)
+
+# 구조화 응답의 decision을 process에 기록할 때 쓰는 기존 안내 문구입니다.
+DEFENSE_CONCESSION = "검토 결과, 제 해결책에 오류가 있었음을 인정합니다."
+REBUTTAL_OPENINGS = {
+    "accept_fix": "해결사의 수정을 검토한 결과, 이제 해결책이 정확함을 확인했습니다.",
+    "concede": "해결사의 반박을 검토한 결과, 제 지적이 틀렸으며 해결사의 원래 주장이 옳았음을 인정합니다.",
+    "maintain": "해결사의 반박에도 불구하고, 여전히 원래 해결책에는 오류가 있습니다.",
+}
+
+def request_defense(client_gpt, solver_message, current_loop):
+    # 반환값: (decision: "concede" | "defend", process에 기록할 방어 내용)
+    def invoke():
+        with track("debate_defense", "openai", GPT_MODEL, round=current_loop, prompt_chars=len(solver_message)) as call:
+            response_loop_gpt = client_gpt.chat.completions.create(
+                model=GPT_MODEL,
+                messages=[
+                    {"role": "system", "content": PROMPT_SOLVER_DEFENSE},
+                    {"role": "user", "content": solver_message}
+                ],
+                response_format=openai_json_format("debate_defense", DEFENSE_SCHEMA)
+            )
+            call.record_usage(response_loop_gpt)
+        record_debate_round(call)
+        return response_loop_gpt.choices[0].message.content
+
+    data, raw_defense = request_structured("debate_defense", invoke, DEFENSE_SCHEMA)
+    if data is None:
+        # 두 번 모두 스키마에 맞지 않으면 기존 문구 판정으로 대신합니다.
+        raw_defense = raw_defense or ""
+        return ("concede" if "오류가 있었음을 인정합니다" in raw_defense else "defend"), raw_defense
+    gpt_defense = with_final_answer(data["response"].strip(), data["final_answer"])
+    if data["decision"] == "concede":
+        gpt_defense = f"{DEFENSE_CONCESSION} {gpt_defense}"
+    return data["decision"], gpt_defense
+
+def request_rebuttal(gemini_model, verifier_message, image_part, current_loop):
+    # 반환값: (decision: "accept_fix" | "concede" | "maintain", process에 기록할 재평가 내용)
+    def invoke():
+        with track("debate_rebuttal", "gemini", GEMINI_MODEL, round=current_loop, prompt_chars=len(verifier_message)) as call:
+            response_loop_gemini = gemini_model.generate_content(
+                [PROMPT_VERIFIER_REBUTTAL, verifier_message, image_part],
+                generation_config=gemini_json_config(REBUTTAL_SCHEMA)
+            )
+            call.record_usage(response_loop_gemini)
+        record_debate_round(call)
+        return response_loop_gemini.text
+
+    data, raw_reaction = request_structured("debate_rebuttal", invoke, REBUTTAL_SCHEMA)
+    if data is None:
+        raw_reaction = raw_reaction or ""
+        if "원래 주장이 옳았음을 인정합니다" in raw_reaction:
+            return "concede", raw_reaction
+        if "정확함을 확인했습니다" in raw_reaction:
+            return "accept_fix", raw_reaction
+        return "maintain", raw_reaction
+    gemini_reaction = f"{REBUTTAL_OPENINGS[data['decision']]} {data['response'].strip()}"
+    if data["decision"] == "maintain" and data["corrected_solution"].strip():
+        gemini_reaction += f"\n\n## 올바른 해결책\n{with_final_answer(data['corrected_solution'].strip(), data['final_answer'])}"
+    return data["decision"], gemini_reaction
+
+def run_debate(client_gpt, gemini_model, a01, verification, image_part, credit_scores, status_updates):
     # === Step 6: Conflict Resolution Loop ===
+    # 반환값: 승자, 최종 답변, 검증 통과 여부, 이번 토론의 점수 변화량
+    score_deltas = empty_scores()
+    is_correct = verification["is_correct"]
+    r02 = verification["text"]
     final_answer = ""
     winner = ""
 
@@ -379,23 +857,19 @@ def run_analysis_logic(project_id, image_file, user_question):
         max_loops = 5
         loop_active = True
         current_critique = r02.replace("모델 01의 해결책에는 다음과 같은 오류가 있습니다.", "").strip()
+        # 다음 라운드에는 전체 비판 대신 쟁점, 양측의 현재 답, 지난 라운드 요약만 전달합니다.
+        debate_state = DebateState(a01, max_chars=DEBATE_CONTEXT_MAX_CHARS)
+        debate_state.record_critique(current_critique)
 
         while loop_active and current_loop < max_loops:
             current_loop += 1
             
-            response_loop_gpt = client_gpt.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {"role": "system", "content": PROMPT_SOLVER_DEFENSE},
-                    {"role": "user", "content": f"감사관의 비판:\n{current_critique}"}
-                ]
-            )
-            gpt_defense = response_loop_gpt.choices[0].message.content
+            defense_decision, gpt_defense = request_defense(client_gpt, debate_state.solver_message(), current_loop)
             status_updates.append({"model": "GPT", "content": gpt_defense, "step": f"라운드 {current_loop} 방어"})
 
-            if "오류가 있었음을 인정합니다" in gpt_defense:
+            if defense_decision == "concede":
                 points = (2**(2 * current_loop - 1)) - 1 # Gemini wins
-                credit_scores["Gemini"] += points
+                score_deltas["Gemini"] += points
                 
                 # Gemini wins, so the final answer is Gemini's proposed solution from the critique
                 solution_parts = current_critique.split("## 올바른 해결책")
@@ -409,26 +883,26 @@ def run_analysis_logic(project_id, image_file, user_question):
                 loop_active = False
                 break
 
-            response_loop_gemini = gemini_model.generate_content(
-                [PROMPT_VERIFIER_REBUTTAL, f"GPT 방어:\n{gpt_defense}", pil_image_verify]
-            )
-            gemini_reaction = response_loop_gemini.text
+            verifier_message = debate_state.verifier_message(gpt_defense)
+            debate_state.record_defense(gpt_defense)
+            rebuttal_decision, gemini_reaction = request_rebuttal(gemini_model, verifier_message, image_part, current_loop)
             status_updates.append({"model": "Gemini", "content": gemini_reaction, "step": f"라운드 {current_loop} 재평가"})
 
-            if "원래 주장이 옳았음을 인정합니다" in gemini_reaction:
+            if rebuttal_decision == "concede":
                 points = (2**(2 * current_loop)) - 1 # GPT wins
-                credit_scores["GPT"] += points
+                score_deltas["GPT"] += points
                 final_answer = gpt_defense
                 winner = "GPT"
                 loop_active = False
-            elif "정확함을 확인했습니다" in gemini_reaction:
+            elif rebuttal_decision == "accept_fix":
                 points = (2**(2 * current_loop - 1)) - 1 # Gemini wins
-                credit_scores["Gemini"] += points
+                score_deltas["Gemini"] += points
                 final_answer = gpt_defense
                 winner = "Gemini"
                 loop_active = False
             else:
                 current_critique = gemini_reaction
+                debate_state.record_critique(current_critique)
                 if current_loop == max_loops:
                     winner = "Draw (Timeout)"
                     score_gpt = credit_scores["GPT"]
@@ -442,21 +916,190 @@ def run_analysis_logic(project_id, image_file, user_question):
                         else:
                             final_answer = a01
                     loop_active = False
+
+    return {"winner": winner, "final_answer": final_answer, "is_correct": is_correct, "score_deltas": score_deltas}
+
+def add_problem_stages(graph, client_gpt, gemini_model, fast_model, user_question, credit_scores, status_updates):
+    # "prepare_image"와 "knowledge" 단계가 이미 등록된 그래프에 문제 하나의 풀이/검증/토론/요약 단계를 추가합니다.
+    # base64 인코딩은 Step 1-3과 동시에, 요약 호출은 입력이 준비되는 즉시 동시에 실행됩니다.
+    graph.add("encode_image", lambda prepare_image: prepare_image.data_url, deps=["prepare_image"])
+    graph.add("solve", lambda knowledge, encode_image: solve_initial(
+        client_gpt, knowledge, user_question, encode_image, status_updates), deps=["knowledge", "encode_image"])
+    # 빠른 검증이 켜진 프로젝트는 저가 모델의 독립 답을 Step 2-4와 동시에 구해 두고,
+    # GPT 최종 답과 일치하면 정밀 검증(PROMPT_VERIFIER_INIT)과 토론을 건너뜁니다.
+    graph.add("quick_answer", lambda prepare_image: generate_quick_answer(
+        fast_model, prepare_image.gemini_part, user_question) if fast_model else None, deps=["prepare_image"])
+    def verify_stage(solve, quick_answer, prepare_image):
+        verification = fast_verify(solve, quick_answer, status_updates) if fast_model else None
+        return verification or verify_solution(gemini_model, user_question, solve, prepare_image.gemini_part, status_updates)
+
+    graph.add("verify", verify_stage, deps=["solve", "quick_answer", "prepare_image"])
+    graph.add("debate", lambda solve, verify, prepare_image: run_debate(
+        client_gpt, gemini_model, solve, verify, prepare_image.gemini_part, credit_scores, status_updates),
+        deps=["solve", "verify", "prepare_image"])
+    # 토론 요약은 초기 답변과 검증 결과만 사용하므로 토론 루프와 동시에 실행됩니다.
+    graph.add("summary", lambda solve, verify: generate_debate_summary(
+        gemini_model, solve, verify["text"], verify["is_correct"]), deps=["solve", "verify"])
+    # 참고: 더 깔끔한 요약 생성을 위해 소스 모델 접두사가 없는 원본 final_answer를 전달합니다.
+    graph.add("conclusion", lambda debate: generate_conclusion_summary(
+        gemini_model, debate["winner"], debate["final_answer"]), deps=["debate"])
+    return graph
+
+def run_analysis_logic(project_id, image_file, user_question, on_update=None, settings=None):
+    # settings: 호출한 쪽이 이미 읽은 프로젝트 설정 (캐시 키와 같은 검증 단계로 실행하기 위해 전달)
+    providers = get_providers()
+    client_gpt = providers.openai
+    gemini_model = providers.gemini(GEMINI_MODEL)
     
-    save_project_scores(project_id, credit_scores)
-    
+    credit_scores = load_project_scores(project_id)
+    settings = settings or project_settings.get(project_id)
+    fast_model = providers.gemini(FAST_VERIFY_MODEL) if settings["fast_verify"] == "fast" else None
+    status_updates = StatusLog(on_update)
+
+    # 이미지는 한 번만 디코딩/축소/재인코딩하고, 모든 모델 호출이 같은 바이트와 PIL 객체를 공유합니다.
+    image_file.seek(0)
+    image_bytes = image_file.read()
+
+    # 파이프라인을 단계 의존성 그래프로 구성합니다.
+    graph = StageGraph()
+    graph.add("prepare_image", lambda: preprocess_image(
+        image_bytes, max_edge=IMAGE_MAX_EDGE, jpeg_quality=IMAGE_JPEG_QUALITY))
+    graph.add("classify", lambda prepare_image: classify_subject(
+        gemini_model, prepare_image.gemini_part, user_question, status_updates), deps=["prepare_image"])
+    graph.add("knowledge", lambda classify: build_knowledge_package(
+        gemini_model, classify, status_updates), deps=["classify"])
+    add_problem_stages(graph, client_gpt, gemini_model, fast_model, user_question, credit_scores, status_updates)
+    graph.add("save_scores", lambda debate: add_project_scores(
+        project_id, debate["score_deltas"]), deps=["debate"])
+
+    with request_scope() as request_metrics:
+        results, timings = graph.run(max_workers=PIPELINE_MAX_WORKERS)
+    debate = results["debate"]
+
     # 새로 추가된 5단계 요약 형식 생성
-    # 참고: 더 깔끔한 요약 생성을 위해 소스 모델 접두사가 없는 원본 final_answer를 전달합니다.
-    formatted_summary = format_final_summary(gemini_model, a01, r02, final_answer, winner, is_correct)
+    formatted_summary = format_final_summary(debate["final_answer"], results["summary"], results["conclusion"])
 
     # 프론트엔드에 반환되는 최종 답변은 새로 포맷된 요약문입니다.
     return {
-        "winner": winner,
+        "winner": debate["winner"],
         "final_answer": formatted_summary, # 새로운 포맷의 요약문을 메인 답변으로 반환
-        "scores": credit_scores,
-        "process": status_updates
+        "scores": results["save_scores"],
+        "process": list(status_updates),
+        "step_offsets": list(status_updates.offsets),
+        "timings": timings,
+        "metrics": request_metrics.to_dict()
     }
 
+def run_batch_logic(project_id, images, user_question, emit):
+    # 여러 문제 이미지를 한 번에 처리합니다.
+    # 1) 모든 이미지를 동시에 전처리/주제 분류하고, 2) 주제별로 묶어 지식 패키지를 주제당 한 번만 만든 뒤,
+    # 3) 문제별 풀이/검증/토론을 동시에 실행하여 끝나는 순서대로 emit("item", ...)으로 전달합니다.
+    # 신뢰도 점수는 배치 전체의 변화량을 모아 마지막에 한 번만 저장합니다.
+    providers = get_providers()
+    client_gpt = providers.openai
+    gemini_model = providers.gemini(GEMINI_MODEL)
+
+    credit_scores = load_project_scores(project_id)
+    settings = project_settings.get(project_id)
+    fast_model = providers.gemini(FAST_VERIFY_MODEL) if settings["fast_verify"] == "fast" else None
+    score_deltas = empty_scores()
+    winners = {}
+    failed = 0
+
+    def item_error(item, e):
+        print(f"Error processing batch item {item['index']}: {e}")
+        emit("item", {"index": item["index"], "filename": item["filename"], "error": "An unexpected error occurred."})
+
+    def classify_item(item):
+        with batch_slots:
+            prepared = preprocess_image(item["bytes"], max_edge=IMAGE_MAX_EDGE, jpeg_quality=IMAGE_JPEG_QUALITY)
+            status_updates = StatusLog()
+            subject = classify_subject(gemini_model, prepared.gemini_part, user_question, status_updates)
+        return {**item, "prepared": prepared, "subject": subject, "process": list(status_updates)}
+
+    def build_subject_package(group):
+        with batch_slots:
+            status_updates = StatusLog()
+            package = build_knowledge_package(gemini_model, group["subject"], status_updates)
+        return {**group, "package": package, "process": list(status_updates)}
+
+    def solve_item(item, group):
+        with batch_slots:
+            status_updates = StatusLog()
+            status_updates.extend(item["process"] + group["process"])
+            graph = StageGraph()
+            graph.add("prepare_image", lambda: item["prepared"])
+            graph.add("knowledge", lambda: group["package"])
+            add_problem_stages(graph, client_gpt, gemini_model, fast_model, user_question, credit_scores, status_updates)
+            results, timings = graph.run(max_workers=PIPELINE_MAX_WORKERS)
+        debate = results["debate"]
+        result = {
+            "index": item["index"],
+            "filename": item["filename"],
+            "subject": item["subject"],
+            "winner": debate["winner"],
+            "final_answer": format_final_summary(debate["final_answer"], results["summary"], results["conclusion"]),
+            "process": list(status_updates),
+            "timings": timings,
+        }
+        result["session_id"] = record_session(project_id, user_question, result, status_updates.offsets)
+        return compact_result(result), debate["score_deltas"]
+
+    with request_scope() as request_metrics, ThreadPoolExecutor(
+            max_workers=BATCH_MAX_CONCURRENCY, thread_name_prefix="batch") as executor:
+        # === 1. 전처리 및 주제 분류 ===
+        classified = []
+        futures = {submit_with_context(executor, classify_item, item): item for item in images}
+        for future in as_completed(futures):
+            try:
+                classified.append(future.result())
+            except Exception as e:
+                failed += 1
+                item_error(futures[future], e)
+
+        # === 2. 주제별 지식 패키지 (주제당 한 번) ===
+        groups = {}
+        for item in sorted(classified, key=lambda item: item["index"]):
+            group = groups.setdefault(normalize_subject(item["subject"]), {"subject": item["subject"], "items": []})
+            group["items"].append(item)
+        emit("subjects", [{"subject": group["subject"], "items": [item["index"] for item in group["items"]]}
+                          for group in groups.values()])
+
+        futures = {submit_with_context(executor, build_subject_package, group): group for group in groups.values()}
+        packaged = []
+        for future in as_completed(futures):
+            try:
+                packaged.append(future.result())
+            except Exception as e:
+                for item in futures[future]["items"]:
+                    failed += 1
+                    item_error(item, e)
+
+        # === 3. 문제별 풀이/검증/토론 ===
+        futures = {submit_with_context(executor, solve_item, item, group): item
+                   for group in packaged for item in group["items"]}
+        for future in as_completed(futures):
+            try:
+                result, deltas = future.result()
+            except Exception as e:
+                failed += 1
+                item_error(futures[future], e)
+                continue
+            for model, points in deltas.items():
+                score_deltas[model] += points
+            winners[result["winner"]] = winners.get(result["winner"], 0) + 1
+            emit("item", result)
+
+    # === 4. 배치 전체 점수를 한 번에 저장 ===
+    scores = add_project_scores(project_id, score_deltas)
+    emit("done", {
+        "count": len(images),
+        "failed": failed,
+        "winners": winners,
+        "scores": scores,
+        "metrics": request_metrics.to_dict()["totals"],
+    })
+
 # =======================================================
 # [API 라우트] 웹 페이지 및 API 엔드포인트
 # =======================================================
@@ -465,30 +1108,341 @@ def run_analysis_logic(project_id, image_file, user_question):
 def index():
     return render_template('index.html')
 
-@app.route('/api/solve', methods=['POST'])
-def solve_problem():
+def parse_solve_request():
+    # /api/solve 계열 엔드포인트의 공통 입력 검증입니다. 오류 시 (None, 오류 응답)을 반환합니다.
     if 'image' not in request.files:
-        return jsonify({"error": "No image file provided"}), 400
-    
-    image_file = request.files['image']
-    user_question = request.form.get('question', 'Please solve the problem in the image.')
-    project_id = request.form.get('project_id', PROJECT_ID) # PROJECT_ID는 폴백(fallback)으로 사용됩니다.
+        return None, (jsonify({"error": "No image file provided"}), 400)
 
+    image_file = request.files['image']
     if image_file.filename == '':
-        return jsonify({"error": "No selected file"}), 400
+        return None, (jsonify({"error": "No selected file"}), 400)
+
+    return {
+        # 요청 컨텍스트가 끝난 뒤(스트리밍/백그라운드)에도 사용할 수 있도록 이미지를 메모리로 복사합니다.
+        "image_bytes": image_file.read(),
+        "user_question": request.form.get('question', 'Please solve the problem in the image.'),
+        "project_id": request.form.get('project_id', PROJECT_ID), # PROJECT_ID는 폴백(fallback)으로 사용됩니다.
+        # cache_mode: "use"(기본값) 캐시 사용, "bypass" 캐시 조회/저장 생략, "refresh" 기존 항목 무효화 후 재계산
+        "cache_mode": request.form.get('cache_mode', 'use'),
+    }, None
+
+def solve_with_cache(project_id, image_bytes, user_question, cache_mode='use', on_update=None):
+    settings = project_settings.get(project_id)
+    cache_key = make_result_cache_key(image_bytes, user_question, settings["fast_verify"])
+
+    if cache_mode == 'refresh':
+        result_cache.invalidate(cache_key)
+    elif cache_mode != 'bypass':
+        cached_result = result_cache.get(cache_key)
+        if cached_result is not None:
+            if on_update:
+                for update in cached_result["process"]:
+                    on_update(update)
+            # 캐시 적중 시 토론을 다시 하지 않으므로 신뢰도 점수도 변경하지 않습니다.
+            result = {**cached_result, "scores": load_project_scores(project_id), "cached": True}
+            return {**result, "session_id": record_session(project_id, user_question, result)}
+
+    result = run_analysis_logic(project_id, io.BytesIO(image_bytes), user_question, on_update=on_update,
+                                settings=settings)
+    step_offsets = result.pop("step_offsets")
+    if cache_mode != 'bypass':
+        result_cache.set(cache_key, {key: result[key] for key in ("winner", "final_answer", "process")})
+    result = {**result, "cached": False}
+    return {**result, "session_id": record_session(project_id, user_question, result, step_offsets)}
+
+def solve_job(**params):
+    # 작업 상태(to_dict)에 process가 이미 포함되므로 작업 결과는 /api/solve와 같은 요약 형식으로 저장합니다.
+    return compact_result(solve_with_cache(**params))
+
+job_queue = JobQueue(solve_job, concurrency=JOB_CONCURRENCY, max_queue_depth=JOB_MAX_QUEUE_DEPTH)
+
+def collect_runtime_gauges():
+    gauges = []
+    for cache_name, cache in (("knowledge", knowledge_cache), ("results", result_cache)):
+        stats = cache.stats()
+        for key in ("hits", "misses", "evictions", "entries"):
+            gauges.append((f"gempt_cache_{key}", {"cache": cache_name}, stats[key]))
+    if knowledge_index is not None:
+        gauges.append(("gempt_knowledge_index_documents", {}, knowledge_index.count()))
+    queue_stats = job_queue.stats()
+    gauges.append(("gempt_job_queue_depth", {}, queue_stats["queue_depth"]))
+    for status, count in queue_stats["jobs"].items():
+        gauges.append(("gempt_jobs", {"status": status}, count))
+    return gauges
+
+metrics_registry.register_gauges(collect_runtime_gauges)
+
+def format_sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.route('/api/solve', methods=['POST'])
+def solve_problem():
+    params, error_response = parse_solve_request()
+    if error_response:
+        return error_response
+
+    # 작업 모드: 파이프라인을 작업 큐에 넣고 작업 ID를 즉시 반환합니다.
+    if request.values.get('mode') == 'async':
+        try:
+            job = job_queue.submit(**params)
+        except QueueFullError:
+            return jsonify({"error": "Too many pending jobs. Please try again later."}), 503
+        return jsonify({"job_id": job.job_id, "status": job.status, "status_url": f"/api/jobs/{job.job_id}"}), 202
 
     try:
-        result = run_analysis_logic(project_id, image_file, user_question)
-        return jsonify(result)
+        result = solve_with_cache(**params)
+        # include=process를 지정하면 기존처럼 process 전문을 함께 반환합니다.
+        if request.values.get('include') == 'process':
+            return jsonify(result)
+        return jsonify(compact_result(result))
+    except UpstreamUnavailableError as e:
+        # 재시도 후에도 프로바이더가 응답하지 않으면 일반 500 대신 재시도 가능한 503을 반환합니다.
+        print(f"Upstream unavailable: {e}")
+        return upstream_unavailable_response(e)
     except Exception as e:
         print(f"Error processing request: {e}")
         return jsonify({"error": "An unexpected error occurred."}), 500
 
+def upstream_unavailable_response(error):
+    response = jsonify({"error": "The AI provider is busy. Please try again later.", "provider": error.provider})
+    response.status_code = 503
+    response.headers["Retry-After"] = str(int(error.retry_after or 30))
+    return response
+
+def sse_response(produce):
+    # produce(emit)를 백그라운드 스레드에서 실행하고, emit(event, data)로 보낸 이벤트를 Server-Sent Events로 전달합니다.
+    events = queue.Queue()
+
+    def worker():
+        try:
+            produce(lambda event, data: events.put((event, data)))
+        except UpstreamUnavailableError as e:
+            print(f"Upstream unavailable: {e}")
+            events.put(("error", {"error": "The AI provider is busy. Please try again later.", "provider": e.provider}))
+        except Exception as e:
+            print(f"Error processing request: {e}")
+            events.put(("error", {"error": "An unexpected error occurred."}))
+        finally:
+            events.put(None)
+
+    threading.Thread(target=worker, daemon=True).start()
+
+    def generate():
+        while True:
+            try:
+                item = events.get(timeout=SSE_KEEPALIVE_INTERVAL)
+            except queue.Empty:
+                # 긴 모델 호출 중 프록시가 연결을 끊지 않도록 주석 이벤트를 보냅니다.
+                yield ": keep-alive\n\n"
+                continue
+            if item is None:
+                break
+            yield format_sse(*item)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.route('/api/solve/stream', methods=['POST'])
+def solve_problem_stream():
+    # /api/solve와 같은 입력을 받아, 각 과정 단계를 완료되는 즉시 Server-Sent Events로 전송합니다.
+    # 이벤트 종류: "step"(process 항목), "result"(winner/final_answer/scores), "error"
+    params, error_response = parse_solve_request()
+    if error_response:
+        return error_response
+
+    def produce(emit):
+        result = solve_with_cache(**params, on_update=lambda update: emit("step", update))
+        emit("result", {key: value for key, value in compact_result(result).items() if key != "process"})
+
+    return sse_response(produce)
+
+@app.route('/api/solve/batch', methods=['POST'])
+def solve_problem_batch():
+    # 여러 문제 이미지(images 필드에 여러 파일, PDF는 페이지별로 분리)를 한 번에 풀고 결과를 SSE로 전송합니다.
+    # 이벤트 종류: "subjects"(주제별 문제 묶음), "item"(문제별 결과, 완료 순서), "done"(점수 및 합계), "error"
+    files = [file for file in request.files.getlist('images') + request.files.getlist('image') if file.filename]
+    if not files:
+        return jsonify({"error": "No image file provided"}), 400
+
+    too_many = (jsonify({"error": f"Too many problems in one batch (max {BATCH_MAX_ITEMS})"}), 400)
+    uploads = [(file.filename, file.read()) for file in files]
+    is_pdf = [filename.lower().endswith(".pdf") or data.startswith(b"%PDF") for filename, data in uploads]
+    # PDF를 렌더링하기 전에 문제 수 상한을 확인합니다. 각 PDF는 이미지 파일과 앞선 PDF 페이지를 뺀 남은 수만큼만 렌더링합니다.
+    budget = BATCH_MAX_ITEMS - is_pdf.count(False)
+    if budget < 0:
+        return too_many
+
+    images = []
+    for (filename, data), pdf in zip(uploads, is_pdf):
+        if not pdf:
+            images.append((filename, data))
+            continue
+        try:
+            pages = split_pdf_pages(data, max_pages=budget)
+        except PdfPageLimitError:
+            return too_many
+        except PdfSupportUnavailableError as e:
+            print(f"Error splitting PDF {filename}: {e}")
+            return jsonify({"error": "PDF uploads are not supported on this server (pypdfium2 is not installed)"}), 501
+        except Exception as e:
+            print(f"Error splitting PDF {filename}: {e}")
+            return jsonify({"error": f"Could not read PDF file: {filename}"}), 400
+        budget -= len(pages)
+        images.extend((f"{filename}#page={number}", page) for number, page in enumerate(pages, start=1))
+
+    items = [{"index": index, "filename": filename, "bytes": data} for index, (filename, data) in enumerate(images)]
+    user_question = request.form.get('question', 'Please solve the problem in the image.')
+    project_id = request.form.get('project_id', PROJECT_ID)
+
+    return sse_response(lambda emit: run_batch_logic(project_id, items, user_question, emit))
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job_status(job_id):
+    # 작업 상태와 지금까지 완료된 process 단계, 완료 시 최종 결과를 반환합니다.
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/api/jobs/<job_id>/result', methods=['GET'])
+def get_job_result(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    if job.status == "failed":
+        return jsonify({"error": job.error}), 500
+    if job.status != "done":
+        return jsonify(job.to_dict(include_result=False)), 202
+    return jsonify(job.result)
+
+@app.route('/api/jobs', methods=['GET'])
+def get_job_queue_stats():
+    return jsonify(job_queue.stats())
+
+@app.route('/api/projects/<project_id>/settings', methods=['GET'])
+def get_project_settings(project_id):
+    return jsonify(project_settings.get(project_id))
+
+@app.route('/api/projects/<project_id>/settings', methods=['PUT', 'PATCH'])
+def update_project_settings(project_id):
+    changes = request.get_json(silent=True)
+    if not isinstance(changes, dict):
+        return jsonify({"error": "JSON object body required"}), 400
+    try:
+        return jsonify(project_settings.update(project_id, changes))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+def page_param(name, default, maximum=None):
+    # 페이지 관련 쿼리 파라미터를 0 이상의 정수로 읽습니다. 잘못된 값이면 ValueError를 냅니다.
+    value = int(request.args.get(name, default))
+    if value < 0:
+        raise ValueError(f"{name} must not be negative")
+    return min(value, maximum) if maximum else value
+
+@app.route('/api/projects/<project_id>/sessions', methods=['GET'])
+def get_project_sessions(project_id):
+    # 프로젝트의 풀이 세션을 최신순으로 반환합니다. 다음 페이지는 ?cursor=<next_cursor>로 요청합니다.
+    if history_store is None:
+        return jsonify({"error": "Session history is disabled"}), 404
+    try:
+        limit = page_param('limit', HISTORY_PAGE_SIZE, HISTORY_MAX_PAGE_SIZE) or HISTORY_PAGE_SIZE
+        cursor = request.args.get('cursor')
+        sessions, next_cursor = history_store.list_sessions(
+            project_id, limit=limit, cursor=int(cursor) if cursor else None)
+    except ValueError as e:
+        return jsonify({"error": f"Invalid pagination parameter: {e}"}), 400
+    return jsonify({"sessions": sessions, "next_cursor": next_cursor})
+
+@app.route('/api/sessions/<session_id>', methods=['GET'])
+def get_session(session_id):
+    session = history_store.get_session(session_id) if history_store is not None else None
+    if session is None:
+        return jsonify({"error": "Session not found"}), 404
+    return jsonify(session)
+
+@app.route('/api/sessions/<session_id>/steps', methods=['GET'])
+def get_session_steps(session_id):
+    # 세션의 process 단계를 순서대로 반환합니다. 다음 페이지는 ?offset=<next_offset>으로 요청합니다.
+    try:
+        offset = page_param('offset', 0)
+        limit = page_param('limit', HISTORY_MAX_PAGE_SIZE, HISTORY_MAX_PAGE_SIZE) or HISTORY_MAX_PAGE_SIZE
+    except ValueError as e:
+        return jsonify({"error": f"Invalid pagination parameter: {e}"}), 400
+    steps = history_store.get_steps(session_id, offset=offset, limit=limit) if history_store is not None else None
+    if steps is None:
+        return jsonify({"error": "Session not found"}), 404
+    return jsonify(steps)
+
 @app.route('/api/scores/<project_id>', methods=['GET'])
 def get_project_scores(project_id):
     scores = load_project_scores(project_id)
     return jsonify(scores)
 
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    return Response(metrics_registry.render(), mimetype="text/plain; version=0.0.4")
+
+@app.route('/api/cache/stats', methods=['GET'])
+def get_cache_stats():
+    return jsonify({"knowledge": knowledge_cache.stats(), "results": result_cache.stats()})
+
+# =======================================================
+# [운영 서버] 워밍업, 상태 확인, 애플리케이션 팩토리
+# =======================================================
+# 개발 서버(flask run)처럼 create_app()을 거치지 않으면 첫 요청에서 클라이언트를 만들므로 처음부터 준비 상태입니다.
+readiness = {"status": "ready", "error": None, "warm_up_seconds": None}
+readiness_lock = threading.Lock()
+
+def warm_up():
+    # 프로바이더 SDK 임포트, 클라이언트와 Gemini 모델 객체 생성, 점수 저장소 연결을 첫 요청 전에 미리 수행합니다.
+    started = time.perf_counter()
+    try:
+        providers = get_providers()
+        providers.gemini(GEMINI_MODEL)
+        providers.gemini(FAST_VERIFY_MODEL)
+        load_project_scores(PROJECT_ID)
+    except Exception as e:
+        print(f"Error warming up providers: {e}")
+        with readiness_lock:
+            readiness.update(status="error", error=str(e))
+        return
+    with readiness_lock:
+        readiness.update(status="ready", error=None, warm_up_seconds=round(time.perf_counter() - started, 3))
+
+@app.route('/api/health', methods=['GET'])
+def get_health():
+    # 프로세스가 요청을 처리할 수 있는지만 확인합니다. (liveness)
+    return jsonify({"status": "ok"})
+
+@app.route('/api/ready', methods=['GET'])
+def get_readiness():
+    # 워밍업이 끝나 바로 풀이 요청을 처리할 수 있으면 200, 아직 준비 중이거나 실패했으면 503을 반환합니다. (readiness)
+    with readiness_lock:
+        state = dict(readiness)
+    if state["status"] != "ready":
+        return jsonify(state), 503
+    return jsonify({**state, "job_queue": job_queue.stats()})
+
+def create_app(warm_up_mode=None):
+    # gunicorn/uvicorn 진입점: "app:create_app()" 또는 wsgi.py의 application을 사용합니다.
+    # 라우트와 저장소는 모듈 임포트 시 한 번 구성되고, 여기서는 워밍업과 정적 자산 미들웨어만 적용합니다.
+    mode = warm_up_mode or WARM_UP
+    if not isinstance(app.wsgi_app, SharedDataMiddleware):
+        app.wsgi_app = SharedDataMiddleware(
+            app.wsgi_app, {app.static_url_path: app.static_folder}, cache_timeout=STATIC_MAX_AGE)
+    if mode in ("sync", "background"):
+        with readiness_lock:
+            readiness.update(status="starting")
+        if mode == "sync":
+            warm_up()
+        else:
+            threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+    return app
+
 # =======================================================
 # [애플리케이션 실행]
 # =======================================================
@@ -0,0 +1,175 @@
+import re
+import json
+import math
+import time
+import random
+import threading
+from types import SimpleNamespace
+
+# =======================================================
+# [벤치마크] 결정적 가짜 OpenAI / Gemini / SerpAPI 프로바이더
+# =======================================================
+# 시나리오
+#   agree     : Gemini 검증이 곧바로 GPT 답변에 동의합니다. (Draw (Agreement))
+#   concede:N : N번째 라운드 방어에서 GPT가 오류를 인정합니다. (Gemini 승)
+#   timeout   : 두 모델 모두 max_loops까지 주장을 굽히지 않습니다. (Draw (Timeout))
+SCENARIOS = ("agree", "concede", "timeout")
+
+# 토론 라운드를 상태 없이 추적하기 위해 가짜 응답 본문에 라운드 표식을 넣습니다.
+ROUND_MARKER = re.compile(r"\[bench-round (\d+)\]")
+
+# 감사관이 비판과 함께 다시 쓰는 전체 풀이입니다. 실제 응답처럼 길게 만들어 토론 압축 효과를 측정할 수 있게 합니다.
+VERIFIER_SOLUTION = "\n".join(
+    f"{step}단계: 여인수 전개로 \\(a_{{1{step}}} C_{{1{step}}}\\)를 계산하고 부호를 확인합니다. " * 3
+    for step in range(1, 9)
+)
+
+
+def parse_scenario(spec):
+    name, _, arg = spec.partition(":")
+    if name not in SCENARIOS:
+        raise ValueError(f"Unknown scenario: {spec}")
+    concede_round = int(arg or 1) if name == "concede" else None
+    return name, concede_round
+
+
+class LatencyModel:
+    # 중앙값 median초, 로그 표준편차 sigma의 로그정규 분포로 지연 시간을 뽑습니다. sigma=0이면 고정 지연입니다.
+    def __init__(self, median, sigma=0.0, seed=0):
+        self.median = median
+        self.sigma = sigma
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def parse(cls, spec, seed=0):
+        median, _, sigma = spec.partition(":")
+        return cls(float(median), float(sigma or 0), seed=seed)
+
+    def sleep(self):
+        if self.median <= 0:
+            return
+        with self._lock:
+            delay = self.median * math.exp(self._random.gauss(0, self.sigma)) if self.sigma else self.median
+        time.sleep(delay)
+
+
+def _usage_tokens(*texts):
+    # 실제 토크나이저 대신 글자 수 기반의 대략적인 토큰 수를 사용합니다.
+    return sum(len(str(text)) for text in texts) // 4 + 1
+
+
+def _json(**fields):
+    # JSON 모드 응답 본문입니다.
+    return json.dumps(fields, ensure_ascii=False)
+
+
+def _template_head(template):
+    return template.strip().split("{")[0][:40]
+
+
+def _current_round(text):
+    match = ROUND_MARKER.search(text or "")
+    return int(match.group(1)) if match else 0
+
+
+class FakeGeminiModel:
+    def __init__(self, providers, model_name):
+        self.providers = providers
+        self.model_name = model_name
+
+    def generate_content(self, parts, **kwargs):
+        self.providers.gemini_latency.sleep()
+        prompts = self.providers.prompts
+        prompt = parts[0] if isinstance(parts[0], str) else ""
+        rest = "\n".join(part for part in parts[1:] if isinstance(part, str))
+
+        if prompt == prompts.PROMPT_SUBJECT_CLASSIFIER:
+            text = self.providers.subject
+        elif prompt.strip().startswith(_template_head(prompts.PROMPT_KNOWLEDGE_CRAWLER_QUERIES)):
+            text = "행렬식이란\n역행렬 공식\n고유값과 고유벡터 정의"
+        elif prompt.strip().startswith(_template_head(prompts.PROMPT_KNOWLEDGE_PACKAGE_GENERATOR)):
+            text = _json(field=self.providers.subject, symbols=["A"], formulas=["det(A)"],
+                         definitions=["행렬식"], examples=[], context_text="벤치마크용 지식 패키지")
+        elif prompt == getattr(prompts, "PROMPT_QUICK_ANSWER", None):
+            # 빠른 검증: agree 시나리오에서만 GPT 최종 답(2)과 일치합니다.
+            text = "2" if self.providers.scenario == "agree" else "-2"
+        elif prompt == prompts.PROMPT_VERIFIER_INIT:
+            if self.providers.scenario == "agree":
+                text = _json(verdict="correct", analysis="검토 결과 풀이가 정확합니다.", corrected_solution="", final_answer="2")
+            else:
+                text = _json(verdict="incorrect", analysis="2단계 계산이 틀렸습니다. [bench-round 0]",
+                             corrected_solution=VERIFIER_SOLUTION, final_answer="-2")
+        elif prompt == prompts.PROMPT_VERIFIER_REBUTTAL:
+            current_round = _current_round(rest)
+            text = _json(decision="maintain", response=f"2단계 부호가 여전히 틀렸습니다. [bench-round {current_round}]",
+                         corrected_solution=VERIFIER_SOLUTION, final_answer="-2")
+        elif prompt.strip().startswith(_template_head(prompts.PROMPT_DEBATE_SUMMARY)):
+            text = _json(calculation_summary="벤치마크 요약", gpt_errors=["계산 오류"], gemini_verification=["재계산"])
+        else:
+            text = "벤치마크용 결론 요약입니다."
+
+        return SimpleNamespace(
+            text=text,
+            usage_metadata=SimpleNamespace(
+                prompt_token_count=_usage_tokens(*[part for part in parts if isinstance(part, str)]),
+                candidates_token_count=_usage_tokens(text),
+            ),
+        )
+
+
+class FakeChatCompletions:
+    def __init__(self, providers):
+        self.providers = providers
+
+    def create(self, model, messages, **kwargs):
+        self.providers.openai_latency.sleep()
+        system_prompt = messages[0]["content"]
+        user_content = messages[-1]["content"]
+        user_text = user_content if isinstance(user_content, str) else " ".join(
+            part.get("text", "") for part in user_content if isinstance(part, dict))
+
+        if system_prompt == self.providers.prompts.PROMPT_SOLVER_DEFENSE:
+            current_round = _current_round(user_text) + 1
+            if self.providers.scenario == "concede" and current_round >= self.providers.concede_round:
+                text = _json(decision="concede", response=f"부호 계산을 잘못했습니다. [bench-round {current_round}]",
+                             final_answer="-2")
+            else:
+                text = _json(decision="defend", response=f"제 원래 풀이는 정확합니다. [bench-round {current_round}]",
+                             final_answer="2")
+        else:
+            text = "## 단계별 해결책\n행렬식을 계산합니다.\n\n### 출처\n- **방법/정리:** 행렬식 정의\n\n### 최종 답변\n2"
+
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=text))],
+            usage=SimpleNamespace(
+                prompt_tokens=_usage_tokens(system_prompt, user_text),
+                completion_tokens=_usage_tokens(text),
+            ),
+        )
+
+
+class FakeProviders:
+    # providers.Providers와 같은 인터페이스(openai, gemini(name), google_search(query, timeout))를 제공합니다.
+    # prompts는 프롬프트 상수를 가진 app 모듈이며, 호출된 프롬프트에 맞는 각본 응답을 돌려줍니다.
+    def __init__(self, prompts, scenario="agree", gemini_latency=None, openai_latency=None,
+                 search_latency=None, subject="선형대수학"):
+        self.prompts = prompts
+        self.scenario, self.concede_round = parse_scenario(scenario)
+        self.gemini_latency = gemini_latency or LatencyModel(0)
+        self.openai_latency = openai_latency or LatencyModel(0)
+        self.search_latency = search_latency or LatencyModel(0)
+        self.subject = subject
+        self.openai = SimpleNamespace(chat=SimpleNamespace(completions=FakeChatCompletions(self)))
+        self._models = {}
+
+    def gemini(self, model_name):
+        return self._models.setdefault(model_name, FakeGeminiModel(self, model_name))
+
+    def google_search(self, query, timeout):
+        self.search_latency.sleep()
+        return {"organic_results": [
+            {"title": f"{query} - 결과 {index}", "snippet": f"{query}에 대한 설명 {index}",
+             "link": f"https://example.com/{index}?q={query}"}
+            for index in range(3)
+        ]}
@@ -0,0 +1,226 @@
+import io
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import resource
+import tracemalloc
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# =======================================================
+# [벤치마크] /api/solve, /api/scores 오프라인 부하 테스트
+# =======================================================
+# 실제 API 키 없이 가짜 프로바이더로 파이프라인 전체를 구동하여 지연 시간과 처리량을 측정합니다.
+# backend 디렉토리에서 실행합니다:
+#   python -m bench.run_bench --scenario concede:2 --concurrency 8 --solves 40 --score-reads 200
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline load test for the GemPT solve pipeline.")
+    parser.add_argument("--scenario", default="agree",
+                        help="agree | concede:N | timeout (debate outcome scripted by the fake providers)")
+    parser.add_argument("--concurrency", type=int, default=4, help="number of concurrent client threads")
+    parser.add_argument("--solves", type=int, default=20, help="number of POST /api/solve requests")
+    parser.add_argument("--score-reads", type=int, default=100, help="number of GET /api/scores requests")
+    parser.add_argument("--projects", type=int, default=5, help="number of distinct project ids to spread load over")
+    parser.add_argument("--image", default=os.path.join(BACKEND_DIR, "test_image.png"))
+    parser.add_argument("--gemini-latency", default="0.05:0.3", help="MEDIAN[:SIGMA] seconds, lognormal")
+    parser.add_argument("--openai-latency", default="0.05:0.3", help="MEDIAN[:SIGMA] seconds, lognormal")
+    parser.add_argument("--search-latency", default="0.02:0.3", help="MEDIAN[:SIGMA] seconds, lognormal")
+    parser.add_argument("--rate-limit", default="0",
+                        help="RATE[:BURST] requests/s applied to every fake provider by the upstream scheduler (0 = unlimited)")
+    parser.add_argument("--score-backend", default="sqlite", choices=["sqlite", "json"])
+    parser.add_argument("--cache-mode", default="bypass", choices=["use", "bypass", "refresh"],
+                        help="result cache mode sent with each solve (bypass measures the full pipeline)")
+    parser.add_argument("--no-knowledge-cache", action="store_true",
+                        help="disable the subject knowledge cache so every solve crawls")
+    parser.add_argument("--no-knowledge-index", action="store_true",
+                        help="disable the local knowledge index so every crawl calls the search provider")
+    parser.add_argument("--fast-verify", default="off", choices=["off", "fast"],
+                        help="default fast verification tier for the benchmark projects")
+    parser.add_argument("--trace-memory", action="store_true", help="track Python heap peak with tracemalloc")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    parser.add_argument("--keep-workdir", action="store_true",
+                        help="keep the temporary directory with the score/cache/history files after the run")
+    return parser.parse_args(argv)
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def summarize(latencies, errors, elapsed):
+    return {
+        "count": len(latencies),
+        "errors": errors,
+        "p50": round(percentile(latencies, 50), 4),
+        "p95": round(percentile(latencies, 95), 4),
+        "p99": round(percentile(latencies, 99), 4),
+        "max": round(max(latencies), 4) if latencies else 0.0,
+        "rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+    }
+
+
+def load_app(args, workdir):
+    # app 모듈은 임포트 시점에 설정을 읽으므로, 임시 작업 디렉토리와 환경 변수를 먼저 준비합니다.
+    os.chdir(workdir)
+    os.environ["SCORE_BACKEND"] = args.score_backend
+    os.environ["SCORE_DB_FILE"] = os.path.join(workdir, "project_db.sqlite3")
+    os.environ["KNOWLEDGE_CACHE_FILE"] = os.path.join(workdir, "knowledge_cache.json")
+    os.environ["RESULT_CACHE_FILE"] = os.path.join(workdir, "result_cache.json")
+    os.environ["PROJECT_SETTINGS_FILE"] = os.path.join(workdir, "project_settings.json")
+    os.environ["SESSION_HISTORY_FILE"] = os.path.join(workdir, "session_history.sqlite3")
+    os.environ["FAST_VERIFY_DEFAULT"] = args.fast_verify
+    for provider in ("OPENAI", "GEMINI", "SERPAPI"):
+        os.environ[f"UPSTREAM_RATE_{provider}"] = args.rate_limit
+    os.environ["KNOWLEDGE_INDEX_FILE"] = "" if args.no_knowledge_index else os.path.join(workdir, "knowledge_index.sqlite3")
+    if args.no_knowledge_cache:
+        os.environ["KNOWLEDGE_CACHE_MAX_ENTRIES"] = "0"
+    sys.path.insert(0, BACKEND_DIR)
+
+    import app
+    import providers
+    from upstream import ScheduledProviders
+    from bench.fakes import FakeProviders, LatencyModel
+
+    # 가짜 프로바이더도 실제와 같이 업스트림 스케줄러(속도 제한, 재시도, 요청 합치기)를 거칩니다.
+    providers.set_providers(ScheduledProviders(FakeProviders(
+        app,
+        scenario=args.scenario,
+        gemini_latency=LatencyModel.parse(args.gemini_latency, seed=args.seed),
+        openai_latency=LatencyModel.parse(args.openai_latency, seed=args.seed + 1),
+        search_latency=LatencyModel.parse(args.search_latency, seed=args.seed + 2),
+    ), app.upstream_scheduler))
+    return app
+
+
+def run(args):
+    # 점수/캐시/토론 기록 파일은 임시 디렉토리에 만들고, --keep-workdir가 없으면 실행 후 삭제합니다.
+    cwd = os.getcwd()
+    workdir = tempfile.mkdtemp(prefix="gempt-bench-")
+    try:
+        return run_in(args, workdir)
+    finally:
+        os.chdir(cwd)
+        if not args.keep_workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+def run_in(args, workdir):
+    with open(args.image, "rb") as f:
+        image_bytes = f.read()
+
+    app = load_app(args, workdir)
+    client_local = threading.local()
+
+    def client():
+        # Flask 테스트 클라이언트는 스레드마다 하나씩 사용합니다.
+        if not hasattr(client_local, "client"):
+            client_local.client = app.app.test_client()
+        return client_local.client
+
+    rng = random.Random(args.seed)
+    project_ids = [f"bench_project_{index}" for index in range(args.projects)]
+    workload = [("solve", rng.choice(project_ids)) for _ in range(args.solves)]
+    workload += [("scores", rng.choice(project_ids)) for _ in range(args.score_reads)]
+    rng.shuffle(workload)
+
+    latencies = {"solve": [], "scores": []}
+    errors = {"solve": 0, "scores": 0}
+    winners = {}
+    round_tokens = {}   # 토론 라운드 -> 해당 라운드 호출들의 프롬프트 토큰 수 목록
+    lock = threading.Lock()
+
+    def execute(item):
+        kind, project_id = item
+        started = time.perf_counter()
+        if kind == "solve":
+            response = client().post("/api/solve", data={
+                "image": (io.BytesIO(image_bytes), os.path.basename(args.image)),
+                "question": "이 행렬의 행렬식을 구하세요.",
+                "project_id": project_id,
+                "cache_mode": args.cache_mode,
+            })
+        else:
+            response = client().get(f"/api/scores/{project_id}")
+        elapsed = time.perf_counter() - started
+        with lock:
+            if response.status_code == 200:
+                latencies[kind].append(elapsed)
+                if kind == "solve":
+                    payload = response.get_json()
+                    winners[payload.get("winner")] = winners.get(payload.get("winner"), 0) + 1
+                    for call in payload.get("metrics", {}).get("calls", []):
+                        # 진행 중인 동일 요청에 합쳐진 호출은 토큰이 0으로 기록되므로 평균에서 제외합니다.
+                        if "round" in call and not call.get("coalesced"):
+                            round_tokens.setdefault(call["round"], []).append(call["prompt_tokens"])
+            else:
+                errors[kind] += 1
+
+    if args.trace_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        list(executor.map(execute, workload))
+    elapsed = time.perf_counter() - started
+
+    memory = {"max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)}
+    if args.trace_memory:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        memory["python_heap_peak_mb"] = round(peak / (1024 * 1024), 1)
+
+    total = sum(len(values) for values in latencies.values())
+    return {
+        "scenario": args.scenario,
+        "concurrency": args.concurrency,
+        "score_backend": args.score_backend,
+        "elapsed": round(elapsed, 3),
+        "throughput_rps": round(total / elapsed, 2) if elapsed else 0.0,
+        "solve": summarize(latencies["solve"], errors["solve"], elapsed),
+        "scores": summarize(latencies["scores"], errors["scores"], elapsed),
+        "winners": winners,
+        "debate_prompt_tokens": {
+            str(number): round(sum(values) / len(values), 1) for number, values in sorted(round_tokens.items())
+        },
+        "memory": memory,
+        "workdir": workdir if args.keep_workdir else None,
+    }
+
+
+def print_report(report):
+    print(f"scenario={report['scenario']} concurrency={report['concurrency']} "
+          f"score_backend={report['score_backend']} elapsed={report['elapsed']}s "
+          f"throughput={report['throughput_rps']} req/s")
+    print(f"{'endpoint':<10}{'count':>7}{'errors':>8}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}{'req/s':>9}")
+    for name in ("solve", "scores"):
+        stats = report[name]
+        print(f"{name:<10}{stats['count']:>7}{stats['errors']:>8}{stats['p50']:>9.3f}{stats['p95']:>9.3f}"
+              f"{stats['p99']:>9.3f}{stats['max']:>9.3f}{stats['rps']:>9.2f}")
+    print(f"winners={report['winners']} memory={report['memory']}")
+    if report["debate_prompt_tokens"]:
+        print(f"debate prompt tokens per call by round={report['debate_prompt_tokens']}")
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = run(args)
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
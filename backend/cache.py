@@ -0,0 +1,129 @@
+import os
+import json
+import time
+import tempfile
+import threading
+from collections import OrderedDict
+
+# =======================================================
+# [캐시] TTL + LRU 캐시 (선택적 디스크 영속화)
+# =======================================================
+class TTLCache:
+    # max_entries를 넘으면 가장 오래 사용되지 않은 항목부터 제거하고,
+    # ttl_seconds가 지난 항목은 조회 시점에 만료 처리합니다.
+    # persist_path가 주어지면 변경될 때마다 JSON 파일로 저장하고, 시작 시 다시 불러옵니다.
+    # 저장은 잠금 안에서 항목 목록만 복사하고, JSON 인코딩과 파일 쓰기는 잠금 밖에서 하므로 조회가 디스크 쓰기를 기다리지 않습니다.
+    # 여러 워커 프로세스가 같은 파일을 쓰면 파일은 깨지지 않지만 마지막으로 저장한 워커의 항목만 남습니다.
+    def __init__(self, max_entries=128, ttl_seconds=7 * 24 * 3600, persist_path=None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.persist_path = persist_path
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> (저장 시각, 값)
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._version = 0           # 변경할 때마다 증가하는 스냅샷 번호
+        self._written_version = 0   # 마지막으로 파일에 쓴 스냅샷 번호
+        self._load()
+
+    def get(self, key):
+        snapshot = None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._is_expired(entry):
+                del self._entries[key]
+                entry = None
+                snapshot = self._snapshot()
+            if entry is None:
+                self.misses += 1
+            else:
+                self._entries.move_to_end(key)
+                self.hits += 1
+        self._persist(snapshot)
+        return entry[1] if entry is not None else None
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.time(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            snapshot = self._snapshot()
+        self._persist(snapshot)
+
+    def invalidate(self, key):
+        with self._lock:
+            removed = self._entries.pop(key, None) is not None
+            snapshot = self._snapshot() if removed else None
+        self._persist(snapshot)
+        return removed
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            snapshot = self._snapshot()
+        self._persist(snapshot)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def _is_expired(self, entry):
+        return self.ttl_seconds is not None and time.time() - entry[0] > self.ttl_seconds
+
+    def _load(self):
+        if not self.persist_path or not os.path.exists(self.persist_path):
+            return
+        try:
+            with open(self.persist_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"Error loading cache file {self.persist_path}: {e}")
+            return
+        # 파일에는 오래된 항목부터 저장되어 있으므로 순서대로 넣으면 LRU 순서가 복원됩니다.
+        for item in data:
+            entry = (item["stored_at"], item["value"])
+            if not self._is_expired(entry):
+                self._entries[item["key"]] = entry
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _snapshot(self):
+        # self._lock을 잡은 상태에서 호출합니다. 저장할 항목 목록(얕은 복사)과 스냅샷 번호를 반환합니다.
+        if not self.persist_path:
+            return None
+        self._version += 1
+        return self._version, [(key, stored_at, value) for key, (stored_at, value) in self._entries.items()]
+
+    def _persist(self, snapshot):
+        # 잠금 밖에서 스냅샷을 파일로 씁니다. 더 새로운 스냅샷이 이미 쓰였으면 오래된 스냅샷은 버립니다.
+        if snapshot is None:
+            return
+        version, items = snapshot
+        with self._write_lock:
+            if version <= self._written_version:
+                return
+            data = [{"key": key, "stored_at": stored_at, "value": value} for key, stored_at, value in items]
+            # 임시 파일은 쓰는 쪽마다 따로 만들어, 여러 워커 프로세스가 같은 파일을 저장해도 서로의 임시 파일을 덮어쓰지 않게 합니다.
+            directory, name = os.path.split(self.persist_path)
+            tmp_path = None
+            try:
+                fd, tmp_path = tempfile.mkstemp(dir=directory or ".", prefix=f"{name}.", suffix=".tmp")
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(data, f, ensure_ascii=False)
+                os.replace(tmp_path, self.persist_path)
+                self._written_version = version
+            except Exception as e:
+                print(f"Error saving cache file {self.persist_path}: {e}")
+                if tmp_path and os.path.exists(tmp_path):
+                    os.remove(tmp_path)
@@ -0,0 +1,123 @@
+import re
+
+# =======================================================
+# [토론 압축] 라운드 사이에 전달하는 구조화된 토론 상태
+# =======================================================
+# 감사관의 비판에는 보통 `## 올바른 해결책` 아래 전체 풀이가 다시 쓰여 있어, 이를 그대로 다음 라운드와
+# 요약 프롬프트에 넘기면 라운드마다 프롬프트가 커집니다. DebateState는 쟁점(비판 본문), 양측의 현재 답,
+# 지난 라운드에서 정리된 사항만 유지하고, 다음 호출에는 이 요약만 전달합니다.
+# 감사관의 해결책 전문은 최종 답변 선택에 필요하므로 보관하지만 프롬프트로는 보내지 않습니다.
+SOLUTION_MARKER = "## 올바른 해결책"
+FINAL_ANSWER_MARKER = "### 최종 답변"
+CRITIQUE_PREFIXES = (
+    "모델 01의 해결책에는 다음과 같은 오류가 있습니다.",
+    "해결사의 반박에도 불구하고, 여전히 원래 해결책에는 오류가 있습니다. 최종적으로 올바른 해결책은 다음과 같습니다.",
+    "해결사의 반박에도 불구하고, 여전히 원래 해결책에는 오류가 있습니다.",
+)
+MAX_ANSWER_CHARS = 300
+
+
+def extract_final_answer(solution):
+    # GPT 해결책의 "### 최종 답변" 제목 아래 내용을 추출합니다. 제목이 없으면 None을 반환합니다.
+    parts = solution.split(FINAL_ANSWER_MARKER)
+    if len(parts) < 2:
+        return None
+    return parts[-1].split("\n#")[0].strip()
+
+
+def split_critique(critique):
+    # 감사관 응답을 (비판 본문, 올바른 해결책 본문)으로 나눕니다.
+    claims, _, solution = critique.partition(SOLUTION_MARKER)
+    claims = claims.strip()
+    for prefix in CRITIQUE_PREFIXES:
+        # 정형화된 머리말만 있고 구체적인 비판이 없으면 머리말을 그대로 쟁점으로 남깁니다.
+        if claims.startswith(prefix):
+            claims = claims[len(prefix):].strip() or claims
+            break
+    return claims, solution.strip()
+
+
+def clip(text, max_chars):
+    # max_chars를 넘는 텍스트는 앞부분만 남깁니다. max_chars가 0이면 자르지 않습니다.
+    text = (text or "").strip()
+    if not max_chars or len(text) <= max_chars:
+        return text
+    return text[:max_chars].rstrip() + " …(이하 생략)"
+
+
+def solution_answer(solution):
+    # 해결책에서 최종 답만 뽑습니다. "### 최종 답변" 제목이 없으면 마지막 문단을 답으로 봅니다.
+    answer = extract_final_answer(solution)
+    if answer is None:
+        paragraphs = [paragraph.strip() for paragraph in re.split(r"\n\s*\n", solution) if paragraph.strip()]
+        answer = paragraphs[-1] if paragraphs else ""
+    return clip(answer, MAX_ANSWER_CHARS) or None
+
+
+def compact_solution(solution, max_chars):
+    # 요약 프롬프트용: 출처 목록을 빼고 풀이 본문을 자른 뒤 최종 답을 다시 붙입니다.
+    if not max_chars:
+        return solution
+    body = re.split(r"\n###? 출처", solution)[0].split(FINAL_ANSWER_MARKER)[0]
+    answer = extract_final_answer(solution)
+    compact = clip(body, max_chars)
+    return f"{compact}\n\n{FINAL_ANSWER_MARKER}\n{answer}" if answer else compact
+
+
+def compact_critique(critique, max_chars):
+    # 요약 프롬프트용: 비판 본문과 감사관 해결책을 각각 max_chars로 자릅니다.
+    if not max_chars:
+        return critique
+    claims, solution = split_critique(critique)
+    if not solution:
+        return clip(critique, max_chars)
+    return f"{clip(claims, max_chars)}\n\n{SOLUTION_MARKER}\n{compact_solution(solution, max_chars)}"
+
+
+class DebateState:
+    def __init__(self, a01, max_chars=2000):
+        self.max_chars = max_chars
+        self.round = 0
+        self.gpt_answer = solution_answer(a01)
+        self.gemini_answer = None
+        self.disputed = ""          # 현재 쟁점: 해결책 본문을 뺀 감사관의 비판
+        self.gemini_solution = ""   # 감사관이 제시한 올바른 해결책 전문 (프롬프트로는 보내지 않음)
+        self.resolved = []          # 지난 라운드에서 정리된 사항 (라운드당 한 줄)
+        self.critique = ""
+
+    def record_critique(self, critique):
+        self.critique = critique
+        self.disputed, solution = split_critique(critique)
+        if solution:
+            self.gemini_solution = solution
+            self.gemini_answer = solution_answer(solution) or self.gemini_answer
+
+    def record_defense(self, defense):
+        self.round += 1
+        self.gpt_answer = extract_final_answer(defense) or self.gpt_answer
+        self.resolved.append(
+            f"라운드 {self.round}: GPT는 답 '{self.gpt_answer or '미상'}'을(를) 유지했고, "
+            f"감사관은 답 '{self.gemini_answer or '미상'}'을(를) 주장했습니다.")
+
+    def solver_message(self):
+        # GPT 방어 라운드에 보내는 사용자 메시지입니다.
+        if not self.max_chars:
+            return f"감사관의 비판:\n{self.critique}"
+        lines = [f"감사관의 비판:\n{clip(self.disputed, self.max_chars)}", ""]
+        if self.gemini_answer:
+            lines.append(f"감사관이 제시한 답: {self.gemini_answer}")
+        if self.gpt_answer:
+            lines.append(f"현재 당신의 답: {self.gpt_answer}")
+        if self.resolved:
+            lines.append("지난 라운드:")
+            lines.extend(f"- {item}" for item in self.resolved)
+        return "\n".join(lines).strip()
+
+    def verifier_message(self, defense):
+        # Gemini 재평가 라운드에 보내는 메시지입니다.
+        if not self.max_chars:
+            return f"GPT 방어:\n{defense}"
+        message = f"GPT 방어:\n{clip(defense, self.max_chars)}"
+        if self.gemini_answer:
+            message += f"\n\n당신이 이전에 제시한 답: {self.gemini_answer}"
+        return message
@@ -0,0 +1,29 @@
+import os
+
+# =======================================================
+# [gunicorn 설정] gunicorn -c gunicorn.conf.py wsgi:application
+# =======================================================
+# 풀이 요청은 모델 호출을 기다리는 시간이 대부분이므로 워커마다 스레드를 여러 개 둡니다. (gthread)
+# 점수/토론 기록/지식 인덱스는 SQLite(WAL)라 여러 워커가 함께 써도 안전하지만, 다음 상태는 워커 프로세스마다 따로 있습니다.
+# - 비동기 작업 큐: 다른 워커에 도착한 /api/jobs/<id> 요청은 404가 됩니다.
+# - 결과 캐시/지식 캐시: 워커마다 따로 적중하고, 디스크에 저장하면 마지막으로 저장한 워커의 항목만 남습니다.
+# - /metrics: 요청을 받은 워커의 수치만 보여 줍니다.
+# 그래서 기본값은 워커 1개에 스레드를 넉넉히 두고, 여러 워커는 위 제약을 감수할 때만 GUNICORN_WORKERS로 늘립니다.
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+workers = int(os.environ.get("GUNICORN_WORKERS", "1"))
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", "16"))
+
+# 토론이 길어지면 한 요청이 수 분 걸리고 SSE 연결은 그보다 오래 유지되므로 기본값(30초)보다 길게 잡습니다.
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "600"))
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", "60"))
+keepalive = int(os.environ.get("GUNICORN_KEEPALIVE", "5"))
+
+# 일정 요청 수마다 워커를 교체해 메모리 증가를 막습니다. 지터로 워커들이 동시에 재시작하지 않게 합니다.
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", "1000"))
+max_requests_jitter = int(os.environ.get("GUNICORN_MAX_REQUESTS_JITTER", "100"))
+
+# 저장소 연결, 스레드 풀, 작업 큐는 fork 이후 워커마다 만들어야 하므로 앱을 미리 로드하지 않습니다.
+# (프로바이더 SDK는 지연 임포트되어 워커 부팅 시간에 포함되지 않고, 워밍업은 WARM_UP 설정에 따라 워커에서 실행됩니다.)
+preload_app = False
+accesslog = os.environ.get("GUNICORN_ACCESS_LOG", "-")
@@ -0,0 +1,147 @@
+import json
+import time
+import uuid
+import zlib
+
+from sqlite_connections import ThreadLocalConnections
+
+# =======================================================
+# [토론 기록 저장소] 풀이 세션과 단계별 과정 로그를 쌓아 두는 SQLite 저장소
+# =======================================================
+# 풀이 한 번이 세션 한 행, process 항목 하나가 단계 한 행입니다. 기록은 추가만 할 수 있고(트리거로 수정/삭제 차단),
+# 단계 본문과 세션 요약(최종 답변, 단계별 소요 시간, 호출 합계)은 zlib으로 압축한 JSON으로 저장합니다.
+# 세션 목록은 프로젝트별 (project_id, id) 인덱스를 따라 id 역순 커서로 페이지를 나눕니다.
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS sessions ("
+    " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+    " session_id TEXT NOT NULL UNIQUE,"
+    " project_id TEXT NOT NULL,"
+    " created_at REAL NOT NULL,"
+    " question TEXT NOT NULL DEFAULT '',"
+    " winner TEXT,"
+    " cached INTEGER NOT NULL DEFAULT 0,"
+    " step_count INTEGER NOT NULL DEFAULT 0,"
+    " duration REAL,"
+    " summary BLOB NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS sessions_project ON sessions (project_id, id)",
+    "CREATE TABLE IF NOT EXISTS session_steps ("
+    " session INTEGER NOT NULL REFERENCES sessions (id),"
+    " seq INTEGER NOT NULL,"
+    " model TEXT NOT NULL DEFAULT '',"
+    " step TEXT NOT NULL DEFAULT '',"
+    " elapsed REAL,"
+    " content BLOB NOT NULL,"
+    " PRIMARY KEY (session, seq)) WITHOUT ROWID",
+    "CREATE TRIGGER IF NOT EXISTS sessions_no_update BEFORE UPDATE ON sessions BEGIN"
+    " SELECT RAISE(ABORT, 'session history is append-only'); END",
+    "CREATE TRIGGER IF NOT EXISTS sessions_no_delete BEFORE DELETE ON sessions BEGIN"
+    " SELECT RAISE(ABORT, 'session history is append-only'); END",
+    "CREATE TRIGGER IF NOT EXISTS session_steps_no_update BEFORE UPDATE ON session_steps BEGIN"
+    " SELECT RAISE(ABORT, 'session history is append-only'); END",
+    "CREATE TRIGGER IF NOT EXISTS session_steps_no_delete BEFORE DELETE ON session_steps BEGIN"
+    " SELECT RAISE(ABORT, 'session history is append-only'); END",
+)
+SESSION_COLUMNS = "id, session_id, project_id, created_at, question, winner, cached, step_count, duration, summary"
+
+
+def pack(value):
+    return zlib.compress(json.dumps(value, ensure_ascii=False).encode("utf-8"))
+
+
+def unpack(blob):
+    return json.loads(zlib.decompress(blob).decode("utf-8"))
+
+
+class SessionHistoryStore:
+    def __init__(self, path):
+        self.path = path
+        self._connections = ThreadLocalConnections(path)
+        conn = self._connections.get()
+        with conn:
+            for statement in SCHEMA:
+                conn.execute(statement)
+
+    def append(self, project_id, question, result, step_offsets=None):
+        # result: /api/solve 결과 (winner, final_answer, process, timings, metrics, cached)
+        # step_offsets: process 항목별 파이프라인 시작 후 경과 시간(초). 캐시 적중 등으로 없으면 None입니다.
+        process = result.get("process") or []
+        offsets = list(step_offsets or [])
+        timings = result.get("timings") or {}
+        duration = (timings.get("total") or {}).get("duration")
+        summary = {
+            "final_answer": result.get("final_answer"),
+            "scores": result.get("scores"),
+            "timings": timings,
+            "metrics": (result.get("metrics") or {}).get("totals"),
+        }
+        session_id = uuid.uuid4().hex
+        conn = self._connections.get()
+        with conn:
+            cursor = conn.execute(
+                "INSERT INTO sessions (session_id, project_id, created_at, question, winner, cached, step_count, duration, summary)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (session_id, project_id, time.time(), question or "", result.get("winner"),
+                 int(bool(result.get("cached"))), len(process), duration, pack(summary)),
+            )
+            conn.executemany(
+                "INSERT INTO session_steps (session, seq, model, step, elapsed, content) VALUES (?, ?, ?, ?, ?, ?)",
+                [(cursor.lastrowid, seq, entry.get("model") or "", str(entry.get("step") or ""),
+                  offsets[seq] if seq < len(offsets) else None, pack(entry.get("content")))
+                 for seq, entry in enumerate(process)],
+            )
+        return session_id
+
+    def list_sessions(self, project_id, limit=20, cursor=None):
+        # 최신 세션부터 limit개를 반환합니다. 다음 페이지가 있으면 next_cursor를 다음 요청의 cursor로 넘깁니다.
+        query = f"SELECT {SESSION_COLUMNS} FROM sessions WHERE project_id = ?"
+        params = [project_id]
+        if cursor is not None:
+            query += " AND id < ?"
+            params.append(int(cursor))
+        rows = self._connections.get().execute(query + " ORDER BY id DESC LIMIT ?", params + [limit + 1]).fetchall()
+        next_cursor = str(rows[limit - 1][0]) if len(rows) > limit else None
+        return [self._session(row) for row in rows[:limit]], next_cursor
+
+    def get_session(self, session_id):
+        row = self._connections.get().execute(
+            f"SELECT {SESSION_COLUMNS} FROM sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        return self._session(row) if row else None
+
+    def get_steps(self, session_id, offset=0, limit=50):
+        # 세션의 process 항목을 순서대로 반환합니다. 세션이 없으면 None을 반환합니다.
+        conn = self._connections.get()
+        row = conn.execute("SELECT id, step_count FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        if row is None:
+            return None
+        steps = conn.execute(
+            "SELECT seq, model, step, elapsed, content FROM session_steps"
+            " WHERE session = ? AND seq >= ? ORDER BY seq LIMIT ?",
+            (row[0], offset, limit),
+        ).fetchall()
+        next_offset = offset + len(steps) if offset + len(steps) < row[1] else None
+        return {
+            "session_id": session_id,
+            "step_count": row[1],
+            "steps": [{"seq": seq, "model": model, "step": step, "elapsed": elapsed, "content": unpack(content)}
+                      for seq, model, step, elapsed, content in steps],
+            "next_offset": next_offset,
+        }
+
+    def count(self):
+        return self._connections.get().execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def _session(self, row):
+        _, session_id, project_id, created_at, question, winner, cached, step_count, duration, summary = row
+        return {
+            "session_id": session_id,
+            "project_id": project_id,
+            "created_at": created_at,
+            "question": question,
+            "winner": winner,
+            "cached": bool(cached),
+            "step_count": step_count,
+            "duration": duration,
+            **unpack(summary),
+        }
+
@@ -0,0 +1,113 @@
+import io
+import base64
+
+from PIL import Image, ImageOps
+
+# =======================================================
+# [이미지 전처리] 한 번 디코딩하고 모든 모델 호출이 같은 버퍼를 공유
+# =======================================================
+class PreparedImage:
+    def __init__(self, pil_image, data, mime_type, original_size):
+        self.pil_image = pil_image
+        self.data = data
+        self.mime_type = mime_type
+        self.original_size = original_size
+        self._base64 = None
+
+    @property
+    def base64(self):
+        if self._base64 is None:
+            self._base64 = base64.b64encode(self.data).decode('utf-8')
+        return self._base64
+
+    @property
+    def gemini_part(self):
+        # Gemini에 PIL 객체를 넘기면 SDK가 다시 인코딩하므로, 전처리된 바이트를 그대로 blob으로 전달합니다.
+        return {"mime_type": self.mime_type, "data": self.data}
+
+    @property
+    def data_url(self):
+        return f"data:{self.mime_type};base64,{self.base64}"
+
+    def describe(self):
+        return {
+            "original_size": list(self.original_size),
+            "size": list(self.pil_image.size),
+            "mime_type": self.mime_type,
+            "bytes": len(self.data),
+        }
+
+
+def preprocess_image(image_bytes, max_edge=1600, jpeg_quality=85):
+    # 1. 한 번만 디코딩하고 EXIF 방향 정보를 적용합니다. (휴대폰 사진이 옆으로 누워 전송되는 문제 방지)
+    # 2. 긴 변이 max_edge를 넘으면 비율을 유지한 채 축소합니다.
+    # 3. 투명도가 없는 이미지는 JPEG로, 투명도가 있는 이미지는 PNG로 다시 인코딩합니다.
+    #    재인코딩 결과가 원본보다 크면(이미 작은 PNG 등) 원본 바이트를 그대로 사용합니다.
+    source = Image.open(io.BytesIO(image_bytes))
+    original_format = source.format
+    original_size = source.size
+    orientation = source.getexif().get(0x0112, 1)
+    image = ImageOps.exif_transpose(source)
+
+    if max_edge and max(image.size) > max_edge:
+        image.thumbnail((max_edge, max_edge), Image.LANCZOS)
+
+    has_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+    if has_alpha:
+        # 스크린샷처럼 알파 채널이 있지만 전부 불투명한 이미지는 JPEG로 보내도 손실이 없습니다.
+        image = image.convert("RGBA")
+        has_alpha = image.getchannel("A").getextrema()[0] < 255
+    buffer = io.BytesIO()
+    if has_alpha:
+        image.save(buffer, format="PNG", optimize=True)
+        mime_type = "image/png"
+    else:
+        image = image.convert("RGB")
+        image.save(buffer, format="JPEG", quality=jpeg_quality, optimize=True)
+        mime_type = "image/jpeg"
+    data = buffer.getvalue()
+
+    # 크기와 방향이 그대로이고 원본이 더 작다면(이미 압축된 작은 이미지) 원본 바이트를 그대로 보냅니다.
+    if image.size == original_size and orientation == 1 and original_format in ("JPEG", "PNG") \
+            and len(image_bytes) <= len(data):
+        data = image_bytes
+        mime_type = Image.MIME[original_format]
+
+    return PreparedImage(image, data, mime_type, original_size)
+
+
+class PdfSupportUnavailableError(RuntimeError):
+    # 서버에 pypdfium2가 설치되지 않은 경우입니다. 업로드한 파일의 문제가 아니라 서버 설정 문제입니다.
+    def __init__(self):
+        super().__init__("PDF 업로드를 처리하려면 pypdfium2 패키지가 필요합니다.")
+
+
+class PdfPageLimitError(ValueError):
+    def __init__(self, page_count, max_pages):
+        super().__init__(f"PDF has {page_count} pages (max {max_pages})")
+        self.page_count = page_count
+        self.max_pages = max_pages
+
+
+def split_pdf_pages(pdf_bytes, scale=2.0, max_pages=None):
+    # PDF의 각 페이지를 PNG 이미지로 렌더링합니다. (배치 풀이용, pypdfium2 필요)
+    # scale=2.0은 약 144 DPI로, 이후 preprocess_image가 max_edge에 맞춰 다시 축소합니다.
+    # 페이지 수가 max_pages를 넘으면 렌더링하기 전에 PdfPageLimitError를 냅니다.
+    try:
+        import pypdfium2 as pdfium
+    except ImportError:
+        raise PdfSupportUnavailableError()
+
+    pdf = pdfium.PdfDocument(pdf_bytes)
+    pages = []
+    try:
+        page_count = len(pdf)
+        if max_pages is not None and page_count > max_pages:
+            raise PdfPageLimitError(page_count, max_pages)
+        for index in range(page_count):
+            buffer = io.BytesIO()
+            pdf[index].render(scale=scale).to_pil().save(buffer, format="PNG")
+            pages.append(buffer.getvalue())
+    finally:
+        pdf.close()
+    return pages
@@ -0,0 +1,117 @@
+import time
+import uuid
+import queue
+import threading
+from collections import OrderedDict
+
+# =======================================================
+# [작업 큐] 프로세스 내 비동기 작업 큐
+# =======================================================
+class QueueFullError(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self.status = "queued"  # queued -> running -> done | failed
+        self.process = []
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._lock = threading.Lock()
+
+    def add_step(self, update):
+        with self._lock:
+            self.process.append(update)
+
+    def to_dict(self, include_result=True):
+        with self._lock:
+            data = {
+                "job_id": self.job_id,
+                "status": self.status,
+                "process": list(self.process),
+                "created_at": self.created_at,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+            }
+            if self.error:
+                data["error"] = self.error
+            if include_result and self.result is not None:
+                data["result"] = self.result
+            return data
+
+
+class JobQueue:
+    # 외부 브로커 없이 한 프로세스 안에서 동작하는 작업 큐입니다.
+    # 워커 스레드 concurrency개가 작업을 처리하며, 대기 중인 작업이 max_queue_depth개를 넘으면 새 작업을 거부합니다.
+    # 완료된 작업은 최근 max_finished_jobs개까지만 보관합니다.
+    def __init__(self, handler, concurrency=2, max_queue_depth=20, max_finished_jobs=500):
+        self.handler = handler
+        self.concurrency = concurrency
+        self.max_finished_jobs = max_finished_jobs
+        self._queue = queue.Queue(maxsize=max_queue_depth)
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._workers = []
+
+    def start(self):
+        with self._lock:
+            if self._workers:
+                return
+            for index in range(self.concurrency):
+                worker = threading.Thread(target=self._run_worker, name=f"job-worker-{index}", daemon=True)
+                worker.start()
+                self._workers.append(worker)
+
+    def submit(self, **kwargs):
+        self.start()
+        job = Job(uuid.uuid4().hex)
+        with self._lock:
+            try:
+                self._queue.put_nowait((job, kwargs))
+            except queue.Full:
+                raise QueueFullError("Job queue is full")
+            self._jobs[job.job_id] = job
+            self._prune()
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def stats(self):
+        with self._lock:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+        return {
+            "concurrency": self.concurrency,
+            "queue_depth": self._queue.qsize(),
+            "max_queue_depth": self._queue.maxsize,
+            "jobs": counts,
+        }
+
+    def _run_worker(self):
+        while True:
+            job, kwargs = self._queue.get()
+            job.status = "running"
+            job.started_at = time.time()
+            try:
+                job.result = self.handler(**kwargs, on_update=job.add_step)
+                job.status = "done"
+            except Exception as e:
+                print(f"Error processing job {job.job_id}: {e}")
+                job.error = "An unexpected error occurred."
+                job.status = "failed"
+            finally:
+                job.finished_at = time.time()
+                self._queue.task_done()
+
+    def _prune(self):
+        # 완료된 작업 중 오래된 것부터 제거합니다. (대기/실행 중인 작업은 유지)
+        finished = [job_id for job_id, job in self._jobs.items() if job.status in ("done", "failed")]
+        for job_id in finished[:max(0, len(finished) - self.max_finished_jobs)]:
+            del self._jobs[job_id]
@@ -0,0 +1,229 @@
+import re
+import sys
+import json
+import time
+import hashlib
+import argparse
+
+from sqlite_connections import ThreadLocalConnections
+
+# =======================================================
+# [지식 인덱스] 검색 결과를 모아 두는 로컬 전문 검색(SQLite FTS5, BM25) 인덱스
+# =======================================================
+# 지식 수집 단계는 검색어마다 이 인덱스를 먼저 조회하고, 결과가 부족할 때만 SerpAPI를 호출합니다.
+# SerpAPI 결과와 일괄 적재한 정의/공식 자료는 출처 링크 기준으로 중복 없이 누적됩니다.
+# backend 디렉토리에서 관리 명령을 실행합니다:
+#   python -m knowledge_index load corpus.jsonl
+#   python -m knowledge_index compact --max-age-days 90
+#   python -m knowledge_index rebuild | stats | search "행렬식 정의"
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS documents ("
+    " id INTEGER PRIMARY KEY,"
+    " link TEXT NOT NULL UNIQUE,"
+    " title TEXT NOT NULL DEFAULT '',"
+    " snippet TEXT NOT NULL DEFAULT '',"
+    " subject TEXT NOT NULL DEFAULT '',"
+    " source TEXT NOT NULL DEFAULT 'serpapi',"
+    " added_at REAL NOT NULL)",
+    # 외부 콘텐츠 FTS 테이블은 트리거로 documents와 동기화합니다.
+    "CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5("
+    " title, snippet, subject, content='documents', content_rowid='id', tokenize='unicode61')",
+    "CREATE TRIGGER IF NOT EXISTS documents_ai AFTER INSERT ON documents BEGIN"
+    " INSERT INTO documents_fts(rowid, title, snippet, subject) VALUES (new.id, new.title, new.snippet, new.subject);"
+    " END",
+    "CREATE TRIGGER IF NOT EXISTS documents_ad AFTER DELETE ON documents BEGIN"
+    " INSERT INTO documents_fts(documents_fts, rowid, title, snippet, subject)"
+    " VALUES ('delete', old.id, old.title, old.snippet, old.subject);"
+    " END",
+    "CREATE TRIGGER IF NOT EXISTS documents_au AFTER UPDATE ON documents BEGIN"
+    " INSERT INTO documents_fts(documents_fts, rowid, title, snippet, subject)"
+    " VALUES ('delete', old.id, old.title, old.snippet, old.subject);"
+    " INSERT INTO documents_fts(rowid, title, snippet, subject) VALUES (new.id, new.title, new.snippet, new.subject);"
+    " END",
+)
+# 제목 일치에 본문보다 높은 가중치를 줍니다. (title, snippet, subject)
+BM25_WEIGHTS = (2.0, 1.0, 0.5)
+TERM_PATTERN = re.compile(r"\w+", re.UNICODE)
+# 검색어 끝의 한국어 조사/어미입니다. ("행렬식이란" -> "행렬식", "역행렬의" -> "역행렬") 긴 것부터 비교합니다.
+KOREAN_SUFFIXES = ("에서의", "이라는", "에서", "으로", "이란", "이다", "라는",
+                   "의", "은", "는", "이", "가", "을", "를", "에", "와", "과", "란", "로", "도")
+# 후보 문서를 BM25 순으로 limit * CANDIDATE_FACTOR개까지 가져와 단어 포함 비율로 거릅니다.
+CANDIDATE_FACTOR = 5
+# 어느 과목에나 나오는 일반 단어입니다. 이 단어만 겹치는 문서는 검색어와 관련 있다고 보지 않습니다.
+GENERIC_TERMS = frozenset(("공식", "정의", "개념", "정리", "성질", "예제", "문제", "풀이", "방법", "계산", "증명", "원리", "유형"))
+
+
+def normalize_subject(subject):
+    # 분류기 출력의 따옴표, 마크다운 강조, 공백 차이를 제거해 같은 주제가 같은 캐시 키와 인덱스 주제를 갖도록 합니다.
+    normalized = (subject or "").strip().strip('"\'`*').strip()
+    return " ".join(normalized.split()).lower()
+
+
+def query_terms(query):
+    # 검색어를 단어 단위로 나누고 조사를 떼어 중복 없는 어간 목록을 만듭니다. 한 글자 단어는 버립니다.
+    terms = []
+    for term in TERM_PATTERN.findall(query.lower()):
+        for suffix in KOREAN_SUFFIXES:
+            if term.endswith(suffix) and len(term) - len(suffix) >= 2:
+                term = term[:-len(suffix)]
+                break
+        if len(term) > 1 and term not in terms:
+            terms.append(term)
+    return terms
+
+
+def match_expression(terms):
+    # 어간마다 접두사 검색을 하고 OR로 묶습니다. ("행렬식"* 은 "행렬식은", "행렬식의"와도 일치)
+    return " OR ".join(f'"{term}"*' for term in terms)
+
+
+class KnowledgeIndex:
+    def __init__(self, path):
+        self.path = path
+        self._connections = ThreadLocalConnections(path)
+        conn = self._connections.get()
+        with conn:
+            for statement in SCHEMA:
+                conn.execute(statement)
+
+    def search(self, query, limit=3, min_coverage=0.5, subject=None):
+        # BM25 점수 순으로 최대 limit개의 {"title", "snippet", "link"}를 반환합니다.
+        # 검색어 어간 중 min_coverage 비율을 넘게 포함하고, 일반 단어가 아닌 어간도 하나 이상 포함한 문서만 결과로 인정합니다.
+        # ("역행렬 공식"에 "공식"만 겹치는 "미분 공식" 문서 제외)
+        # subject가 주어지면 같은 주제로 저장된 문서와 주제 없이 적재된 문서만 찾습니다.
+        terms = query_terms(query)
+        if not terms:
+            return []
+        specific_terms = [term for term in terms if term not in GENERIC_TERMS]
+        weights = ", ".join(str(weight) for weight in BM25_WEIGHTS)
+        query_sql = ("SELECT d.title, d.snippet, d.link, d.subject FROM documents_fts"
+                     " JOIN documents d ON d.id = documents_fts.rowid WHERE documents_fts MATCH ?")
+        params = [match_expression(terms)]
+        if subject is not None:
+            query_sql += " AND d.subject IN (?, '')"
+            params.append(normalize_subject(subject))
+        rows = self._connections.get().execute(
+            query_sql + f" ORDER BY bm25(documents_fts, {weights}) LIMIT ?",
+            params + [limit * CANDIDATE_FACTOR],
+        ).fetchall()
+
+        results = []
+        for title, snippet, link, document_subject in rows:
+            text = f"{title} {snippet} {document_subject}".lower()
+            if specific_terms and not any(term in text for term in specific_terms):
+                continue
+            if sum(term in text for term in terms) > min_coverage * len(terms):
+                results.append({"title": title, "snippet": snippet, "link": link})
+                if len(results) == limit:
+                    break
+        return results
+
+    def add(self, documents, subject="", source="serpapi"):
+        # documents: [{"title", "snippet", "link"}, ...]. 같은 링크는 한 행만 유지하고 내용이 바뀌었으면 갱신합니다.
+        # 링크가 없는 자료(일괄 적재한 정의/공식 등)는 본문 해시로 링크를 만들어 중복을 막습니다.
+        # 주제는 normalize_subject로 정규화해 저장하므로 search(subject=...)의 주제와 그대로 비교할 수 있습니다.
+        rows = []
+        now = time.time()
+        for document in documents:
+            snippet = (document.get("snippet") or document.get("text") or "").strip()
+            title = (document.get("title") or "").strip()
+            if not snippet and not title:
+                continue
+            link = document.get("link") or "corpus:" + hashlib.sha1(f"{title}\n{snippet}".encode("utf-8")).hexdigest()
+            rows.append((link, title, snippet, normalize_subject(document.get("subject") or subject), source, now))
+        if not rows:
+            return 0
+        conn = self._connections.get()
+        with conn:
+            cursor = conn.executemany(
+                "INSERT INTO documents (link, title, snippet, subject, source, added_at) VALUES (?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT(link) DO UPDATE SET"
+                " title = excluded.title, snippet = excluded.snippet, subject = excluded.subject,"
+                " added_at = excluded.added_at"
+                " WHERE title != excluded.title OR snippet != excluded.snippet OR subject != excluded.subject",
+                rows,
+            )
+        return cursor.rowcount
+
+    def count(self):
+        return self._connections.get().execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def stats(self):
+        conn = self._connections.get()
+        by_source = dict(conn.execute("SELECT source, COUNT(*) FROM documents GROUP BY source").fetchall())
+        subjects = conn.execute("SELECT COUNT(DISTINCT subject) FROM documents").fetchone()[0]
+        return {"documents": sum(by_source.values()), "by_source": by_source, "subjects": subjects}
+
+    def rebuild(self):
+        # documents 테이블을 기준으로 FTS 인덱스를 다시 만듭니다. (인덱스가 어긋났거나 토크나이저를 바꾼 경우)
+        conn = self._connections.get()
+        with conn:
+            conn.execute("INSERT INTO documents_fts(documents_fts) VALUES ('rebuild')")
+
+    def compact(self, max_age_days=None):
+        # 오래된 SerpAPI 결과를 지우고(일괄 적재 자료는 유지), FTS 세그먼트를 병합한 뒤 파일을 정리합니다.
+        conn = self._connections.get()
+        removed = 0
+        with conn:
+            if max_age_days:
+                cursor = conn.execute(
+                    "DELETE FROM documents WHERE source = 'serpapi' AND added_at < ?",
+                    (time.time() - max_age_days * 86400,),
+                )
+                removed = cursor.rowcount
+            conn.execute("INSERT INTO documents_fts(documents_fts) VALUES ('optimize')")
+        conn.execute("VACUUM")
+        return removed
+
+
+def load_corpus(index, path, subject=""):
+    # JSON Lines 파일을 일괄 적재합니다. 각 줄: {"title", "snippet" 또는 "text", "link"(선택), "subject"(선택)}
+    documents = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                documents.append(json.loads(line))
+            except ValueError as e:
+                print(f"Skipping line {line_number} of {path}: {e}")
+    return index.add(documents, subject=subject, source="corpus")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage the local knowledge search index.")
+    parser.add_argument("--path", default="knowledge_index.sqlite3", help="index database file")
+    commands = parser.add_subparsers(dest="command", required=True)
+    load = commands.add_parser("load", help="bulk-load a JSON Lines corpus of definitions and formulas")
+    load.add_argument("corpus")
+    load.add_argument("--subject", default="", help="subject for lines that do not set one")
+    commands.add_parser("rebuild", help="rebuild the full-text index from the stored documents")
+    compact = commands.add_parser("compact", help="merge index segments and vacuum the database file")
+    compact.add_argument("--max-age-days", type=float, help="also delete SerpAPI results older than this")
+    commands.add_parser("stats", help="print document counts")
+    search = commands.add_parser("search", help="run a query against the index")
+    search.add_argument("query")
+    search.add_argument("--limit", type=int, default=5)
+    search.add_argument("--min-coverage", type=float, default=0.5)
+    search.add_argument("--subject", help="only documents stored under this subject (or without one)")
+    args = parser.parse_args(argv)
+
+    index = KnowledgeIndex(args.path)
+    if args.command == "load":
+        print(f"Loaded {load_corpus(index, args.corpus, subject=args.subject)} new or updated documents")
+    elif args.command == "rebuild":
+        index.rebuild()
+        print(f"Rebuilt index over {index.count()} documents")
+    elif args.command == "compact":
+        removed = index.compact(max_age_days=args.max_age_days)
+        print(f"Removed {removed} documents, {index.count()} remaining")
+    elif args.command == "stats":
+        print(json.dumps(index.stats(), ensure_ascii=False, indent=2))
+    else:
+        for document in index.search(args.query, limit=args.limit, min_coverage=args.min_coverage,
+                                     subject=args.subject):
+            print(f"{document['title']}\n  {document['snippet']}\n  {document['link']}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
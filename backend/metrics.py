@@ -0,0 +1,260 @@
+import os
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+
+# =======================================================
+# [계측] 단계별 지연 시간, 토큰, 비용 기록 및 Prometheus 텍스트 출력
+# =======================================================
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+# 100만 토큰당 USD (입력, 출력). 환경 변수 PRICE_<MODEL>_INPUT / PRICE_<MODEL>_OUTPUT으로 덮어쓸 수 있습니다.
+DEFAULT_TOKEN_PRICES = {
+    "gpt-4o": (2.50, 10.00),
+    "gemini-2.5-pro": (1.25, 10.00),
+    "gemini-2.5-flash": (0.30, 2.50),
+}
+# SerpAPI 검색 1회당 USD
+SEARCH_PRICE = float(os.environ.get("PRICE_SERPAPI_SEARCH", "0.015"))
+
+
+def token_price(model):
+    default_input, default_output = DEFAULT_TOKEN_PRICES.get(model, (0.0, 0.0))
+    env_prefix = "PRICE_" + model.upper().replace("-", "_").replace(".", "_")
+    return (
+        float(os.environ.get(f"{env_prefix}_INPUT", default_input)),
+        float(os.environ.get(f"{env_prefix}_OUTPUT", default_output)),
+    )
+
+
+def extract_usage(response):
+    # OpenAI 응답은 usage.prompt_tokens/completion_tokens,
+    # Gemini 응답은 usage_metadata.prompt_token_count/candidates_token_count에 토큰 수를 담고 있습니다.
+    usage = getattr(response, "usage", None)
+    if usage is not None:
+        return getattr(usage, "prompt_tokens", 0) or 0, getattr(usage, "completion_tokens", 0) or 0
+    usage = getattr(response, "usage_metadata", None)
+    if usage is not None:
+        return getattr(usage, "prompt_token_count", 0) or 0, getattr(usage, "candidates_token_count", 0) or 0
+    return 0, 0
+
+
+class CallRecord:
+    def __init__(self, stage, provider, model=None, **details):
+        self.stage = stage
+        self.provider = provider
+        self.model = model
+        self.details = details
+        self.duration = 0.0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cost = 0.0
+        self.error = False
+
+    def record_usage(self, response):
+        # 진행 중인 동일 요청의 응답을 함께 받은 경우 토큰과 비용은 원래 호출에서 이미 집계되었으므로 0으로 둡니다.
+        if self.shared_response():
+            return
+        self.prompt_tokens, self.completion_tokens = extract_usage(response)
+        input_price, output_price = token_price(self.model) if self.model else (0.0, 0.0)
+        self.cost = (self.prompt_tokens * input_price + self.completion_tokens * output_price) / 1_000_000
+
+    def shared_response(self):
+        # 직전 업스트림 호출이 다른 요청의 호출 결과를 함께 받은 것이면 True를 반환하고 표시를 지웁니다.
+        shared = _shared_response.get()
+        if shared:
+            _shared_response.set(False)
+            self.details["coalesced"] = True
+        return shared
+
+    def to_dict(self):
+        return {
+            "stage": self.stage,
+            "provider": self.provider,
+            "model": self.model,
+            **self.details,
+            "duration": round(self.duration, 4),
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "cost": round(self.cost, 6),
+            "error": self.error,
+        }
+
+
+class RequestMetrics:
+    # 한 번의 /api/solve 요청 동안 발생한 모든 외부 호출 기록입니다.
+    def __init__(self):
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def add(self, record):
+        with self._lock:
+            self.calls.append(record)
+
+    def to_dict(self):
+        with self._lock:
+            calls = [record.to_dict() for record in self.calls]
+        return {
+            "calls": calls,
+            "totals": {
+                "calls": len(calls),
+                "prompt_tokens": sum(call["prompt_tokens"] for call in calls),
+                "completion_tokens": sum(call["completion_tokens"] for call in calls),
+                "cost": round(sum(call["cost"] for call in calls), 6),
+            },
+        }
+
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+        self.total += 1
+        self.sum += value
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stage_latency = {}   # (stage, provider) -> Histogram
+        self._stage_errors = {}    # (stage, provider) -> int
+        self._tokens = {}          # (stage, provider, type) -> int
+        self._cost = {}            # provider -> float
+        self._pipeline_latency = Histogram()
+        self._counters = {}        # (name, labels) -> int
+        self._gauges = []          # 렌더링 시점에 값을 읽어오는 함수 목록
+
+    def observe_call(self, record):
+        key = (record.stage, record.provider)
+        with self._lock:
+            self._stage_latency.setdefault(key, Histogram()).observe(record.duration)
+            if record.error:
+                self._stage_errors[key] = self._stage_errors.get(key, 0) + 1
+            for token_type, count in (("prompt", record.prompt_tokens), ("completion", record.completion_tokens)):
+                if count:
+                    token_key = (record.stage, record.provider, token_type)
+                    self._tokens[token_key] = self._tokens.get(token_key, 0) + count
+            self._cost[record.provider] = self._cost.get(record.provider, 0.0) + record.cost
+
+    def observe_pipeline(self, seconds):
+        with self._lock:
+            self._pipeline_latency.observe(seconds)
+
+    def increment(self, name, labels=None, amount=1):
+        key = (name, tuple(sorted((labels or {}).items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def register_gauges(self, collect):
+        # collect()는 [(메트릭 이름, 레이블 dict, 값), ...]을 반환하는 함수입니다. (예: 캐시 적중 수)
+        self._gauges.append(collect)
+
+    def render(self):
+        lines = []
+        with self._lock:
+            lines.append("# HELP gempt_stage_duration_seconds Wall time of each upstream call by pipeline stage.")
+            lines.append("# TYPE gempt_stage_duration_seconds histogram")
+            for (stage, provider), histogram in sorted(self._stage_latency.items()):
+                lines.extend(_render_histogram(
+                    "gempt_stage_duration_seconds", {"stage": stage, "provider": provider}, histogram))
+
+            lines.append("# HELP gempt_stage_errors_total Failed upstream calls by pipeline stage.")
+            lines.append("# TYPE gempt_stage_errors_total counter")
+            for (stage, provider), count in sorted(self._stage_errors.items()):
+                lines.append(f"gempt_stage_errors_total{_labels({'stage': stage, 'provider': provider})} {count}")
+
+            lines.append("# HELP gempt_tokens_total Prompt and completion tokens reported by the providers.")
+            lines.append("# TYPE gempt_tokens_total counter")
+            for (stage, provider, token_type), count in sorted(self._tokens.items()):
+                labels = _labels({"stage": stage, "provider": provider, "type": token_type})
+                lines.append(f"gempt_tokens_total{labels} {count}")
+
+            lines.append("# HELP gempt_estimated_cost_usd_total Estimated upstream spend in USD.")
+            lines.append("# TYPE gempt_estimated_cost_usd_total counter")
+            for provider, cost in sorted(self._cost.items()):
+                lines.append(f"gempt_estimated_cost_usd_total{_labels({'provider': provider})} {cost:.6f}")
+
+            lines.append("# HELP gempt_pipeline_duration_seconds End-to-end run_analysis_logic wall time.")
+            lines.append("# TYPE gempt_pipeline_duration_seconds histogram")
+            lines.extend(_render_histogram("gempt_pipeline_duration_seconds", {}, self._pipeline_latency))
+
+            declared = set()
+            for (name, labels), value in sorted(self._counters.items()):
+                if name not in declared:
+                    lines.append(f"# TYPE {name} counter")
+                    declared.add(name)
+                lines.append(f"{name}{_labels(dict(labels))} {value}")
+            gauges = list(self._gauges)
+
+        for collect in gauges:
+            for name, labels, value in collect():
+                lines.append(f"{name}{_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _render_histogram(name, labels, histogram):
+    lines = []
+    for bound, count in zip(histogram.buckets, histogram.counts):
+        lines.append(f"{name}_bucket{_labels({**labels, 'le': bound})} {count}")
+    lines.append(f"{name}_bucket{_labels({**labels, 'le': '+Inf'})} {histogram.total}")
+    lines.append(f"{name}_sum{_labels(labels)} {histogram.sum:.6f}")
+    lines.append(f"{name}_count{_labels(labels)} {histogram.total}")
+    return lines
+
+
+registry = MetricsRegistry()
+_current_request = contextvars.ContextVar("current_request_metrics", default=None)
+# 업스트림 스케줄러가 호출마다 설정합니다. True이면 이 스레드의 직전 호출은 진행 중인 동일 요청의 응답을 함께 받은 것입니다.
+_shared_response = contextvars.ContextVar("shared_upstream_response", default=False)
+
+
+def mark_shared_response(shared):
+    _shared_response.set(shared)
+
+
+@contextmanager
+def request_scope():
+    # 이 블록 안(및 컨텍스트를 복사해 실행한 스레드)에서 track()으로 기록한 호출이 모두 하나의 RequestMetrics에 모입니다.
+    request_metrics = RequestMetrics()
+    token = _current_request.set(request_metrics)
+    started = time.perf_counter()
+    try:
+        yield request_metrics
+    finally:
+        registry.observe_pipeline(time.perf_counter() - started)
+        _current_request.reset(token)
+
+
+@contextmanager
+def track(stage, provider, model=None, **details):
+    record = CallRecord(stage, provider, model, **details)
+    started = time.perf_counter()
+    try:
+        yield record
+    except Exception:
+        record.error = True
+        raise
+    finally:
+        record.duration = time.perf_counter() - started
+        registry.observe_call(record)
+        request_metrics = _current_request.get()
+        if request_metrics is not None:
+            request_metrics.add(record)
@@ -0,0 +1,77 @@
+import os
+import json
+import tempfile
+import threading
+
+# =======================================================
+# [프로젝트 설정] 프로젝트별 파이프라인 옵션 저장소
+# =======================================================
+# fast_verify: "off"  - 항상 gemini-2.5-pro 정밀 검증과 토론을 수행합니다.
+#              "fast" - 저가 모델의 빠른 답과 GPT 최종 답이 일치하면 정밀 검증과 토론을 건너뜁니다.
+# 여러 워커 프로세스가 같은 파일을 함께 쓰므로, 파일이 바뀌면(수정 시각/크기) 다시 읽고
+# 저장할 때는 최신 파일을 다시 읽어 변경분만 반영한 뒤 워커별 임시 파일로 교체합니다.
+FAST_VERIFY_MODES = ("off", "fast")
+
+
+class ProjectSettingsStore:
+    def __init__(self, path, defaults):
+        self.path = path
+        self.defaults = dict(defaults)
+        self._lock = threading.Lock()
+        self._stamp = None
+        self._data = {}
+        self._refresh()
+
+    def get(self, project_id):
+        with self._lock:
+            self._refresh()
+            return {**self.defaults, **self._data.get(project_id, {})}
+
+    def update(self, project_id, changes):
+        # 알 수 없는 키나 허용되지 않는 값은 ValueError로 거부합니다.
+        for key, value in changes.items():
+            if key not in self.defaults:
+                raise ValueError(f"Unknown setting: {key}")
+            if key == "fast_verify" and value not in FAST_VERIFY_MODES:
+                raise ValueError(f"fast_verify must be one of {', '.join(FAST_VERIFY_MODES)}")
+
+        with self._lock:
+            # 다른 워커가 저장한 설정을 덮어쓰지 않도록 캐시가 아닌 현재 파일 내용에 변경분을 반영합니다.
+            self._data = self._read()
+            settings = self._data.setdefault(project_id, {})
+            settings.update(changes)
+            directory, name = os.path.split(self.path)
+            fd, tmp_path = tempfile.mkstemp(dir=directory or ".", prefix=f"{name}.", suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(self._data, f, indent=4, ensure_ascii=False)
+                os.replace(tmp_path, self.path)
+            except Exception:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+            return {**self.defaults, **settings}
+
+    def _refresh(self):
+        # self._lock을 잡은 상태에서 호출합니다. 마지막으로 읽은 뒤 파일이 바뀌었을 때만 다시 읽습니다.
+        stamp = self._file_stamp()
+        if stamp != self._stamp:
+            self._data = self._read()
+            self._stamp = stamp
+
+    def _file_stamp(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _read(self):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"Error reading settings file {self.path}: {e}")
+            return {}
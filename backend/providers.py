@@ -0,0 +1,109 @@
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# =======================================================
+# [프로바이더] 프로세스 전역 OpenAI / Gemini / SerpAPI 클라이언트
+# =======================================================
+# google.generativeai, openai, serpapi는 임포트만으로 1초 이상 걸리므로 모듈 상단이 아니라
+# Providers를 처음 만들 때 임포트합니다. (app 임포트와 워커 부팅을 가볍게 유지, 벤치마크 스텁은 SDK를 읽지 않음)
+_pooled_google_search = None
+
+def pooled_google_search_class():
+    # serpapi 라이브러리는 검색마다 requests.get으로 새 연결을 엽니다.
+    # 공유 세션을 사용해 keep-alive 연결 풀을 재사용하도록 get_response만 바꾼 하위 클래스를 한 번만 만듭니다.
+    global _pooled_google_search
+    if _pooled_google_search is None:
+        from serpapi import GoogleSearch
+
+        class PooledGoogleSearch(GoogleSearch):
+            def __init__(self, params_dict, session, timeout):
+                super().__init__(params_dict)
+                self.session = session
+                self.timeout = timeout
+
+            def get_response(self, path='/search'):
+                url, parameter = self.construct_url(path)
+                return self.session.get(url, params=parameter, timeout=self.timeout)
+
+        _pooled_google_search = PooledGoogleSearch
+    return _pooled_google_search
+
+
+class Providers:
+    # 요청마다 클라이언트를 만들지 않고, 프로세스 시작 시 한 번 만든 클라이언트를 모든 스레드가 공유합니다.
+    # OpenAI 클라이언트(httpx)와 requests 세션은 스레드 간 공유가 안전합니다.
+    def __init__(self, openai_api_key, google_api_key, serpapi_api_key, pool_size=10):
+        try:
+            import httpx
+        except ImportError:
+            # 최신 openai 패키지는 httpx 대신 httpx2를 의존성으로 사용합니다.
+            import httpx2 as httpx
+        import google.generativeai as genai
+        from openai import DefaultHttpxClient, OpenAI
+
+        self.genai = genai
+        self.serpapi_api_key = serpapi_api_key
+        # 재시도는 upstream.UpstreamScheduler가 맡으므로 SDK 자체 재시도는 끕니다.
+        self.openai = OpenAI(
+            api_key=openai_api_key,
+            max_retries=0,
+            http_client=DefaultHttpxClient(
+                limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+                timeout=httpx.Timeout(600.0, connect=10.0),
+            ),
+        )
+        genai.configure(api_key=google_api_key)
+        self._gemini_models = {}
+        self._lock = threading.Lock()
+
+        self.search_session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.search_session.mount("https://", adapter)
+        self.search_session.mount("http://", adapter)
+        # 첫 검색 요청이 serpapi 임포트 시간을 기다리지 않도록 하위 클래스도 미리 만들어 둡니다.
+        pooled_google_search_class()
+
+    def gemini(self, model_name):
+        with self._lock:
+            model = self._gemini_models.get(model_name)
+            if model is None:
+                model = self.genai.GenerativeModel(model_name)
+                self._gemini_models[model_name] = model
+            return model
+
+    def google_search(self, query, timeout):
+        search = pooled_google_search_class()(
+            {"q": query, "api_key": self.serpapi_api_key}, session=self.search_session, timeout=timeout
+        )
+        return search.get_dict()
+
+
+_providers = None
+_providers_factory = None
+_providers_lock = threading.Lock()
+
+def configure_providers(factory):
+    # factory는 인자 없이 Providers(또는 같은 메서드를 가진 로컬 스텁)를 반환하는 함수입니다.
+    # 실제 생성은 처음 get_providers()가 호출될 때 한 번만 일어납니다.
+    global _providers, _providers_factory
+    with _providers_lock:
+        _providers_factory = factory
+        _providers = None
+
+def set_providers(providers):
+    # 테스트/벤치마크에서 스텁 프로바이더로 교체할 때 사용합니다.
+    global _providers
+    with _providers_lock:
+        _providers = providers
+
+def get_providers():
+    global _providers
+    if _providers is None:
+        with _providers_lock:
+            if _providers is None:
+                if _providers_factory is None:
+                    raise RuntimeError("Providers are not configured")
+                _providers = _providers_factory()
+    return _providers
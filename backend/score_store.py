@@ -0,0 +1,131 @@
+import os
+import json
+import time
+import threading
+
+from sqlite_connections import ThreadLocalConnections
+
+# =======================================================
+# [점수 저장소] 프로젝트별 신뢰도 점수 백엔드
+# =======================================================
+MODELS = ("GPT", "Gemini")
+
+def empty_scores():
+    return {model: 0 for model in MODELS}
+
+
+class JsonScoreStore:
+    # 기존 project_db.json 형식을 그대로 사용하는 백엔드입니다.
+    # 프로세스 내 잠금으로 읽기-수정-쓰기를 직렬화하므로 단일 프로세스 배포에서만 안전합니다.
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def get(self, project_id):
+        with self._lock:
+            return dict(self._read().get(project_id, empty_scores()))
+
+    def increment(self, project_id, deltas):
+        with self._lock:
+            data = self._read()
+            scores = data.setdefault(project_id, empty_scores())
+            for model, points in deltas.items():
+                scores[model] = scores.get(model, 0) + points
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=4, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+            return dict(scores)
+
+    def _read(self):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"Error reading score file {self.path}: {e}")
+            return {}
+
+
+class SqliteScoreStore:
+    # 프로젝트당 한 행을 갖는 SQLite(WAL) 백엔드입니다.
+    # 점수 증가는 단일 UPSERT 문으로 처리되어 여러 워커 프로세스가 동시에 써도 갱신이 유실되지 않습니다.
+    def __init__(self, path, migrate_from=None, read_cache_ttl=2.0):
+        self.path = path
+        self.read_cache_ttl = read_cache_ttl
+        self._connections = ThreadLocalConnections(path)
+        self._read_cache = {}  # project_id -> (조회 시각, 점수)
+        self._cache_lock = threading.Lock()
+
+        conn = self._connections.get()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS project_scores ("
+            " project_id TEXT PRIMARY KEY,"
+            " gpt INTEGER NOT NULL DEFAULT 0,"
+            " gemini INTEGER NOT NULL DEFAULT 0)"
+        )
+        conn.execute("CREATE TABLE IF NOT EXISTS migrations (name TEXT PRIMARY KEY, applied_at REAL NOT NULL)")
+        conn.commit()
+        if migrate_from:
+            self._migrate_json(migrate_from)
+
+    def get(self, project_id):
+        now = time.monotonic()
+        with self._cache_lock:
+            cached = self._read_cache.get(project_id)
+            if cached is not None and now - cached[0] < self.read_cache_ttl:
+                return dict(cached[1])
+
+        row = self._connections.get().execute(
+            "SELECT gpt, gemini FROM project_scores WHERE project_id = ?", (project_id,)
+        ).fetchone()
+        scores = {"GPT": row[0], "Gemini": row[1]} if row else empty_scores()
+        with self._cache_lock:
+            self._read_cache[project_id] = (now, scores)
+        return dict(scores)
+
+    def increment(self, project_id, deltas):
+        conn = self._connections.get()
+        with conn:
+            conn.execute(
+                "INSERT INTO project_scores (project_id, gpt, gemini) VALUES (?, ?, ?)"
+                " ON CONFLICT(project_id) DO UPDATE SET"
+                " gpt = gpt + excluded.gpt, gemini = gemini + excluded.gemini",
+                (project_id, deltas.get("GPT", 0), deltas.get("Gemini", 0)),
+            )
+            row = conn.execute(
+                "SELECT gpt, gemini FROM project_scores WHERE project_id = ?", (project_id,)
+            ).fetchone()
+        scores = {"GPT": row[0], "Gemini": row[1]}
+        with self._cache_lock:
+            self._read_cache[project_id] = (time.monotonic(), scores)
+        return dict(scores)
+
+
+    def _migrate_json(self, json_path):
+        # 기존 project_db.json 점수를 한 번만 가져옵니다. 적용 여부는 migrations 테이블에 기록됩니다.
+        migration_name = f"import:{os.path.basename(json_path)}"
+        conn = self._connections.get()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            if conn.execute("SELECT 1 FROM migrations WHERE name = ?", (migration_name,)).fetchone():
+                return
+            data = JsonScoreStore(json_path)._read()
+            for project_id, scores in data.items():
+                conn.execute(
+                    "INSERT INTO project_scores (project_id, gpt, gemini) VALUES (?, ?, ?)"
+                    " ON CONFLICT(project_id) DO UPDATE SET"
+                    " gpt = gpt + excluded.gpt, gemini = gemini + excluded.gemini",
+                    (project_id, scores.get("GPT", 0), scores.get("Gemini", 0)),
+                )
+            conn.execute("INSERT INTO migrations (name, applied_at) VALUES (?, ?)", (migration_name, time.time()))
+        print(f"Migrated {len(data)} projects from {json_path} to {self.path}")
+
+
+def create_score_store(backend, json_path, sqlite_path, read_cache_ttl=2.0):
+    if backend == "json":
+        return JsonScoreStore(json_path)
+    if backend == "sqlite":
+        return SqliteScoreStore(sqlite_path, migrate_from=json_path, read_cache_ttl=read_cache_ttl)
+    raise ValueError(f"Unknown score backend: {backend}")
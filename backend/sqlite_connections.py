@@ -0,0 +1,26 @@
+import sqlite3
+import threading
+
+# =======================================================
+# [SQLite 연결] 점수/토론 기록/지식 인덱스 저장소가 함께 쓰는 스레드별 연결
+# =======================================================
+# sqlite3 연결은 스레드 간 공유할 수 없으므로 스레드마다 하나씩 유지합니다.
+# 모든 저장소는 WAL 모드로 열어 여러 워커 프로세스가 같은 파일을 동시에 읽고 쓸 수 있게 합니다.
+BUSY_TIMEOUT_SECONDS = 30
+
+
+class ThreadLocalConnections:
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self.get().execute("PRAGMA journal_mode=WAL")
+
+    def get(self):
+        # 현재 스레드의 연결을 반환합니다. 처음 호출한 스레드에서는 새로 엽니다.
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_SECONDS)
+            conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_SECONDS * 1000}")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
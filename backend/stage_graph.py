@@ -0,0 +1,64 @@
+import time
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+# =======================================================
+# [파이프라인] 단계 의존성 그래프 실행기
+# =======================================================
+class StageGraph:
+    # 각 단계는 이름, 실행 함수, 의존 단계 목록으로 정의됩니다.
+    # 실행 함수는 의존 단계의 결과를 같은 이름의 키워드 인자로 받습니다.
+    # run()은 의존성이 모두 충족된 단계를 동시에 실행하고, 단계별 시작 시점과 소요 시간을 기록합니다.
+    def __init__(self):
+        self._stages = {}
+
+    def add(self, name, fn, deps=()):
+        for dep in deps:
+            if dep not in self._stages:
+                raise ValueError(f"Stage '{name}' depends on unknown stage '{dep}'")
+        self._stages[name] = (fn, tuple(deps))
+        return self
+
+    def run(self, max_workers=4):
+        results = {}
+        timings = {}
+        pending = dict(self._stages)
+        running = {}
+        started = time.perf_counter()
+
+        def run_stage(name, fn, kwargs):
+            stage_start = time.perf_counter()
+            try:
+                return fn(**kwargs)
+            finally:
+                timings[name] = {
+                    "start": round(stage_start - started, 4),
+                    "duration": round(time.perf_counter() - stage_start, 4),
+                }
+
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="stage") as executor:
+            while pending or running:
+                ready = [name for name, (_, deps) in pending.items() if all(dep in results for dep in deps)]
+                for name in ready:
+                    fn, deps = pending.pop(name)
+                    kwargs = {dep: results[dep] for dep in deps}
+                    # 호출자의 contextvars(요청별 계측 등)가 단계 스레드에서도 보이도록 복사해 실행합니다.
+                    context = contextvars.copy_context()
+                    running[executor.submit(context.run, run_stage, name, fn, kwargs)] = name
+
+                if not running:
+                    raise RuntimeError(f"Unresolvable stage dependencies: {sorted(pending)}")
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    error = future.exception()
+                    if error is not None:
+                        # 실패한 단계가 있으면 아직 시작하지 않은 단계는 취소하고 예외를 그대로 전달합니다.
+                        for other in running:
+                            other.cancel()
+                        raise error
+                    results[name] = future.result()
+
+        timings["total"] = {"start": 0.0, "duration": round(time.perf_counter() - started, 4)}
+        return results, timings
@@ -0,0 +1,87 @@
+import copy
+import json
+
+from metrics import registry
+
+# =======================================================
+# [구조화 출력] JSON 모드 응답 요청, 스키마 검증, 1회 재시도
+# =======================================================
+# 스키마는 Gemini response_schema와 OpenAI json_schema가 함께 이해하는 부분집합
+# (type, properties, required, items, enum)만 사용합니다.
+JSON_TYPES = {"object": dict, "array": list, "string": str, "boolean": bool}
+
+
+class StructuredOutputError(ValueError):
+    pass
+
+
+def gemini_json_config(schema):
+    # Gemini generate_content(generation_config=...)에 넘기는 JSON 모드 설정입니다.
+    return {"response_mime_type": "application/json", "response_schema": schema}
+
+
+def openai_json_format(name, schema):
+    # OpenAI chat.completions.create(response_format=...)에 넘기는 strict JSON 스키마 설정입니다.
+    # strict 모드는 모든 객체에 additionalProperties: false와 전체 필드 required를 요구합니다.
+    def strict(node):
+        node = copy.deepcopy(node)
+        if node.get("type") == "object":
+            node["properties"] = {key: strict(value) for key, value in node["properties"].items()}
+            node["required"] = list(node["properties"])
+            node["additionalProperties"] = False
+        elif node.get("type") == "array":
+            node["items"] = strict(node["items"])
+        return node
+
+    return {"type": "json_schema", "json_schema": {"name": name, "strict": True, "schema": strict(schema)}}
+
+
+def parse_json_object(text):
+    # JSON 모드에서도 일부 모델이 ```json 코드 블록으로 감싸 보내는 경우가 있어 감싼 부분만 벗겨냅니다.
+    if not text:
+        raise StructuredOutputError("empty response")
+    cleaned = text.strip()
+    if cleaned.startswith("```"):
+        cleaned = cleaned.split("\n", 1)[1] if "\n" in cleaned else ""
+        if cleaned.rstrip().endswith("```"):
+            cleaned = cleaned.rstrip()[:-3]
+    try:
+        data = json.loads(cleaned)
+    except ValueError as e:
+        raise StructuredOutputError(f"invalid JSON: {e}")
+    if not isinstance(data, dict):
+        raise StructuredOutputError("expected a JSON object")
+    return data
+
+
+def validate(data, schema, path="$"):
+    expected = JSON_TYPES[schema["type"]]
+    if not isinstance(data, expected):
+        raise StructuredOutputError(f"{path}: expected {schema['type']}")
+    if "enum" in schema and data not in schema["enum"]:
+        raise StructuredOutputError(f"{path}: {data!r} is not one of {schema['enum']}")
+    if schema["type"] == "object":
+        for key in schema.get("required", ()):
+            if key not in data:
+                raise StructuredOutputError(f"{path}: missing field '{key}'")
+        for key, value in data.items():
+            if key in schema["properties"]:
+                validate(value, schema["properties"][key], f"{path}.{key}")
+    elif schema["type"] == "array":
+        for index, item in enumerate(data):
+            validate(item, schema["items"], f"{path}[{index}]")
+    return data
+
+
+def request_structured(stage, invoke, schema):
+    # invoke()는 모델을 한 번 호출하고 응답 텍스트를 반환하는 함수입니다.
+    # 스키마에 맞지 않는 응답이면 한 번만 다시 호출하고, 두 번 모두 실패하면 (None, 마지막 응답 텍스트)를 반환합니다.
+    text = None
+    for attempt in (1, 2):
+        text = invoke()
+        try:
+            return validate(parse_json_object(text), schema), text
+        except StructuredOutputError as e:
+            print(f"Invalid structured output from {stage} (attempt {attempt}): {e}")
+            registry.increment("gempt_structured_output_errors_total", {"stage": stage})
+    return None, text
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 백엔드 모듈은 패키지가 아닌 평면 모듈이므로 backend 디렉토리를 임포트 경로에 추가합니다.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
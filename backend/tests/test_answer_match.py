@@ -0,0 +1,61 @@
+import pytest
+
+from answer_match import answer_parts, answers_match
+
+
+@pytest.mark.parametrize("gpt_answer, quick_answer", [
+    ("3", "3"),
+    ("x = 3", "3"),
+    ("3", "x=3"),
+    ("$x = \\dfrac{1}{2}$", "x=\\frac{1}{2}"),
+    ("**42**.", "42"),
+    ("3.0", "3"),
+    ("x = 3, y = 4", "y=4, x=3"),
+    ("x=3 또는 x=-3", "x=-3, x=3"),
+    ("x=3 \\text{또는} x=-3", "x=3 또는 x=-3"),
+    ("f(x) = 3x + 1", "f(x)=3x+1"),
+    ("1, 1, 2", "2, 1, 1"),
+    ("(1, 2, 3, 4)", "(1.0,2,3,4)"),
+    ("(1, 2), (3, 4)", "(3, 4), (1, 2)"),
+    ("[0, 1)", "[0,1)"),
+])
+def test_equivalent_answers_match(gpt_answer, quick_answer):
+    assert answers_match(gpt_answer, quick_answer)
+
+
+@pytest.mark.parametrize("gpt_answer, quick_answer", [
+    # 여러 값 중 하나만 같은 경우
+    ("x = 3, y = 4", "4"),
+    ("x=3 또는 x=-3", "-3"),
+    ("x=3, y=4", "3, 4"),
+    ("x=3, y=4", "x=3, y=5"),
+    # 좌변 변수가 다른 경우
+    ("x=3", "y=3"),
+    # 좌변이 단순 변수가 아닌 식
+    ("f(x) = 3x + 1", "3x+1"),
+    ("x^2 = 9", "9"),
+    # 중복된 값의 개수가 다른 경우 (중근을 가진 고윳값 등)
+    ("1, 1, 2", "1, 2, 2"),
+    ("1, 1, 2", "1, 2"),
+    # 순서쌍은 성분 순서와 괄호 종류까지 같아야 함
+    ("(1, 2, 3, 4)", "(1, 3, 2, 4)"),
+    ("(1, 2), (3, 4)", "(1, 4), (3, 2)"),
+    ("x = (1, 2)", "x = (2, 1)"),
+    ("[0, 1)", "[0, 1]"),
+    ("(1, 2)", "1, 2"),
+    # 해석할 수 없는 형식
+    ("x = y = 3", "3"),
+    ("x =", "x"),
+    (", 3", "3"),
+    ("", "3"),
+    ("(1, 2", "(1, 2"),
+    ("3", "4"),
+])
+def test_ambiguous_or_different_answers_escalate(gpt_answer, quick_answer):
+    assert not answers_match(gpt_answer, quick_answer)
+
+
+def test_answer_parts_keep_variables_for_multi_part_answers():
+    assert answer_parts("x = 3, y = 4") == [("x", "3"), ("y", "4")]
+    assert answer_parts("x = y = 3") is None
+    assert answer_parts("x = (1.0, 2)") == [("x", "(1,2)")]
@@ -0,0 +1,14 @@
+import os
+
+from cache import TTLCache
+
+
+def test_cache_writers_use_separate_temp_files(tmp_path):
+    # 같은 파일에 저장하는 캐시 두 개가 번갈아 써도 파일이 깨지지 않고 임시 파일이 남지 않아야 합니다.
+    path = str(tmp_path / "cache.json")
+    caches = [TTLCache(persist_path=path) for _ in range(2)]
+    for index in range(20):
+        caches[index % 2].set(f"key-{index}", {"index": index})
+
+    assert os.listdir(tmp_path) == ["cache.json"]
+    assert TTLCache(persist_path=path).get("key-19") == {"index": 19}
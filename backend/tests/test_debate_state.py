@@ -0,0 +1,63 @@
+from debate_state import DebateState, compact_critique, compact_solution, extract_final_answer, split_critique
+
+GPT_SOLUTION = "풀이 과정입니다.\n\n### 최종 답변\nx = 3\n\n### 출처\n- 교과서"
+CRITIQUE = (
+    "모델 01의 해결책에는 다음과 같은 오류가 있습니다. 부호를 잘못 옮겼습니다.\n\n"
+    "## 올바른 해결책\n다시 계산한 풀이입니다.\n\n### 최종 답변\nx = -3"
+)
+
+
+def test_extract_final_answer_reads_last_heading():
+    assert extract_final_answer(GPT_SOLUTION) == "x = 3"
+    assert extract_final_answer("답 제목이 없는 풀이") is None
+
+
+def test_split_critique_drops_boilerplate_prefix():
+    claims, solution = split_critique(CRITIQUE)
+    assert claims == "부호를 잘못 옮겼습니다."
+    assert solution.startswith("다시 계산한 풀이입니다.")
+    # 머리말만 있으면 머리말을 쟁점으로 남깁니다.
+    assert split_critique("모델 01의 해결책에는 다음과 같은 오류가 있습니다.")[0].startswith("모델 01의")
+
+
+def test_debate_state_tracks_answers_across_rounds():
+    state = DebateState(GPT_SOLUTION)
+    assert state.gpt_answer == "x = 3"
+
+    state.record_critique(CRITIQUE)
+    assert state.gemini_answer == "x = -3"
+    assert state.disputed == "부호를 잘못 옮겼습니다."
+
+    state.record_defense("반박합니다.\n\n### 최종 답변\nx = 3")
+    state.record_critique("해결사의 반박에도 불구하고, 여전히 원래 해결책에는 오류가 있습니다. 검산이 틀렸습니다.")
+    # 해결책이 없는 비판은 이전 라운드의 감사관 답과 해결책을 유지합니다.
+    assert state.gemini_answer == "x = -3"
+    assert state.gemini_solution.startswith("다시 계산한 풀이입니다.")
+    assert state.round == 1
+    assert state.resolved == ["라운드 1: GPT는 답 'x = 3'을(를) 유지했고, 감사관은 답 'x = -3'을(를) 주장했습니다."]
+
+
+def test_solver_message_sends_summary_instead_of_full_solution():
+    state = DebateState(GPT_SOLUTION, max_chars=2000)
+    state.record_critique(CRITIQUE)
+    message = state.solver_message()
+    assert "부호를 잘못 옮겼습니다." in message
+    assert "감사관이 제시한 답: x = -3" in message
+    assert "다시 계산한 풀이입니다." not in message
+
+
+def test_messages_are_uncompressed_when_max_chars_is_zero():
+    state = DebateState(GPT_SOLUTION, max_chars=0)
+    state.record_critique(CRITIQUE)
+    assert state.solver_message() == f"감사관의 비판:\n{CRITIQUE}"
+    assert state.verifier_message("방어") == "GPT 방어:\n방어"
+    assert compact_solution(GPT_SOLUTION, 0) == GPT_SOLUTION
+    assert compact_critique(CRITIQUE, 0) == CRITIQUE
+
+
+def test_compact_solution_clips_body_and_keeps_answer():
+    solution = "가" * 50 + "\n\n### 최종 답변\nx = 3\n\n### 출처\n- 교과서"
+    compact = compact_solution(solution, 10)
+    assert compact.startswith("가" * 10 + " …(이하 생략)")
+    assert compact.endswith("### 최종 답변\nx = 3")
+    assert "출처" not in compact
@@ -0,0 +1,75 @@
+import sqlite3
+
+import pytest
+
+from history_store import SessionHistoryStore
+
+
+def make_result(step_count, winner="GPT"):
+    return {
+        "winner": winner,
+        "final_answer": "x = 3",
+        "scores": {"GPT": 1, "Gemini": 0},
+        "process": [{"model": "GPT", "step": f"단계 {seq}", "content": f"내용 {seq}"} for seq in range(step_count)],
+        "timings": {"total": {"duration": 1.5}},
+        "metrics": {"totals": {"calls": step_count}},
+    }
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SessionHistoryStore(str(tmp_path / "history.sqlite3"))
+
+
+def test_append_round_trips_session_and_summary(store):
+    session_id = store.append("project", "문제", make_result(3), step_offsets=[0.1, 0.2])
+    session = store.get_session(session_id)
+    assert session["project_id"] == "project"
+    assert (session["winner"], session["step_count"], session["duration"]) == ("GPT", 3, 1.5)
+    assert session["final_answer"] == "x = 3"
+    assert session["metrics"] == {"calls": 3}
+    assert store.get_session("missing") is None
+
+
+def test_list_sessions_pages_newest_first_by_cursor(store):
+    session_ids = [store.append("project", f"문제 {index}", make_result(1)) for index in range(5)]
+    store.append("other", "다른 프로젝트", make_result(1))
+
+    first, cursor = store.list_sessions("project", limit=2)
+    second, cursor_2 = store.list_sessions("project", limit=2, cursor=cursor)
+    third, cursor_3 = store.list_sessions("project", limit=2, cursor=cursor_2)
+
+    pages = [session["session_id"] for session in first + second + third]
+    assert pages == session_ids[::-1]
+    assert cursor_3 is None
+    assert store.list_sessions("project", limit=5)[1] is None
+
+
+def test_get_steps_pages_by_offset(store):
+    session_id = store.append("project", "문제", make_result(5), step_offsets=[0.5, 1.0])
+
+    page = store.get_steps(session_id, offset=0, limit=2)
+    assert [step["seq"] for step in page["steps"]] == [0, 1]
+    assert [step["elapsed"] for step in page["steps"]] == [0.5, 1.0]
+    assert page["steps"][1]["content"] == "내용 1"
+    assert page["next_offset"] == 2
+
+    last = store.get_steps(session_id, offset=4, limit=2)
+    assert [step["elapsed"] for step in last["steps"]] == [None]
+    assert last["next_offset"] is None
+    assert store.get_steps("missing") is None
+
+
+@pytest.mark.parametrize("statement", [
+    "UPDATE sessions SET winner = 'Gemini'",
+    "DELETE FROM sessions",
+    "UPDATE session_steps SET step = ''",
+    "DELETE FROM session_steps",
+])
+def test_history_is_append_only(store, statement):
+    store.append("project", "문제", make_result(2))
+    conn = sqlite3.connect(store.path)
+    with pytest.raises(sqlite3.IntegrityError, match="append-only"):
+        conn.execute(statement)
+    conn.close()
+    assert store.count() == 1
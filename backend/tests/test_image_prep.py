@@ -0,0 +1,64 @@
+import sys
+import types
+
+import pytest
+
+from image_prep import PdfPageLimitError, PdfSupportUnavailableError, split_pdf_pages
+
+
+class FakePage:
+    def __init__(self, document):
+        self.document = document
+
+    def render(self, scale):
+        self.document.rendered += 1
+        image = types.SimpleNamespace(save=lambda buffer, format: buffer.write(b"png"))
+        return types.SimpleNamespace(to_pil=lambda: image)
+
+
+class FakePdfDocument:
+    # pypdfium2.PdfDocument 대신 페이지 수와 렌더링 횟수만 기록하는 스텁입니다.
+    instances = []
+
+    def __init__(self, data):
+        self.page_count = int(data.replace(b"%PDF", b""))
+        self.rendered = 0
+        self.closed = False
+        FakePdfDocument.instances.append(self)
+
+    def __len__(self):
+        return self.page_count
+
+    def __getitem__(self, index):
+        return FakePage(self)
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def fake_pdfium(monkeypatch):
+    FakePdfDocument.instances = []
+    monkeypatch.setitem(sys.modules, "pypdfium2", types.SimpleNamespace(PdfDocument=FakePdfDocument))
+    return FakePdfDocument
+
+
+def test_split_pdf_pages_renders_every_page(fake_pdfium):
+    assert split_pdf_pages(b"3", max_pages=3) == [b"png", b"png", b"png"]
+    assert fake_pdfium.instances[0].closed
+
+
+def test_split_pdf_pages_rejects_before_rendering_when_over_limit(fake_pdfium):
+    with pytest.raises(PdfPageLimitError) as error:
+        split_pdf_pages(b"500", max_pages=30)
+    document = fake_pdfium.instances[0]
+    assert (error.value.page_count, error.value.max_pages) == (500, 30)
+    assert document.rendered == 0
+    assert document.closed
+
+
+def test_split_pdf_pages_reports_missing_pdfium(monkeypatch):
+    # 임포트가 실패하도록 모듈 자리에 None을 둡니다.
+    monkeypatch.setitem(sys.modules, "pypdfium2", None)
+    with pytest.raises(PdfSupportUnavailableError):
+        split_pdf_pages(b"3")
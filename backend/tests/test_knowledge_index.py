@@ -0,0 +1,57 @@
+from knowledge_index import KnowledgeIndex, normalize_subject, query_terms
+
+CALCULUS_DOCUMENTS = [
+    {"title": "미분 공식", "snippet": "다항함수의 도함수를 구하는 기본 공식입니다.", "link": "https://example.com/derivative"},
+    {"title": "적분 공식", "snippet": "부정적분과 정적분의 기본 공식입니다.", "link": "https://example.com/integral"},
+    {"title": "삼각함수 공식", "snippet": "사인과 코사인의 덧셈 공식입니다.", "link": "https://example.com/trig"},
+]
+LINEAR_ALGEBRA_DOCUMENTS = [
+    {"title": "역행렬 공식", "snippet": "2x2 행렬의 역행렬은 행렬식의 역수를 곱해 구합니다.", "link": "https://example.com/inverse"},
+    {"title": "역행렬의 성질", "snippet": "가역 행렬의 곱의 역행렬은 역순으로 곱한 것입니다.", "link": "https://example.com/inverse-properties"},
+]
+
+
+def make_index(tmp_path):
+    index = KnowledgeIndex(str(tmp_path / "index.sqlite3"))
+    index.add(CALCULUS_DOCUMENTS, subject="미적분학")
+    return index
+
+
+def test_generic_term_alone_does_not_match(tmp_path):
+    # "공식"만 겹치는 미적분 문서는 역행렬 검색 결과가 아닙니다.
+    index = make_index(tmp_path)
+    assert index.search("역행렬 공식") == []
+    assert index.search("역행렬 공식", subject="선형대수학") == []
+
+
+def test_matching_documents_are_found(tmp_path):
+    index = make_index(tmp_path)
+    index.add(LINEAR_ALGEBRA_DOCUMENTS, subject="선형대수학")
+    links = [document["link"] for document in index.search("역행렬 공식")]
+    assert links[0] == "https://example.com/inverse"
+    assert "https://example.com/derivative" not in links
+
+
+def test_search_is_limited_to_subject(tmp_path):
+    index = make_index(tmp_path)
+    index.add([{"title": "미분 공식 정리", "snippet": "선형대수 강의 노트의 미분 공식", "link": "https://example.com/notes"}],
+              subject="선형대수학")
+    index.add([{"title": "미분 공식 요약", "snippet": "주제 없이 적재한 자료", "link": "https://example.com/corpus"}])
+
+    links = {document["link"] for document in index.search("미분 공식", limit=5, subject="**미적분학**")}
+    assert links == {"https://example.com/derivative", "https://example.com/corpus"}
+    assert len(index.search("미분 공식", limit=5)) == 3
+
+
+def test_add_deduplicates_by_link_and_normalizes_subject(tmp_path):
+    index = make_index(tmp_path)
+    assert index.add(CALCULUS_DOCUMENTS, subject="미적분학") == 0
+    assert index.count() == 3
+    assert index.stats()["subjects"] == 1
+    index.add(CALCULUS_DOCUMENTS[:1], subject=' "미적분학" ')
+    assert index.stats()["subjects"] == 1
+
+
+def test_query_terms_strip_particles():
+    assert query_terms("행렬식이란 역행렬의 정의") == ["행렬식", "역행렬", "정의"]
+    assert normalize_subject("  **선형  대수학** ") == "선형 대수학"
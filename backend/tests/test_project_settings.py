@@ -0,0 +1,39 @@
+import json
+import os
+
+import pytest
+
+from project_settings import ProjectSettingsStore
+
+
+def test_settings_saved_by_another_store_are_seen(tmp_path):
+    # 워커 프로세스마다 저장소 객체가 따로 있는 경우와 같이, 한 저장소의 변경이 다른 저장소에서 보여야 합니다.
+    path = str(tmp_path / "settings.json")
+    first = ProjectSettingsStore(path, defaults={"fast_verify": "off"})
+    second = ProjectSettingsStore(path, defaults={"fast_verify": "off"})
+    assert second.get("project") == {"fast_verify": "off"}
+
+    first.update("project", {"fast_verify": "fast"})
+    assert second.get("project") == {"fast_verify": "fast"}
+
+
+def test_settings_update_keeps_changes_from_another_store(tmp_path):
+    path = str(tmp_path / "settings.json")
+    first = ProjectSettingsStore(path, defaults={"fast_verify": "off"})
+    second = ProjectSettingsStore(path, defaults={"fast_verify": "off"})
+
+    first.update("alpha", {"fast_verify": "fast"})
+    second.update("beta", {"fast_verify": "fast"})
+
+    with open(path, encoding="utf-8") as f:
+        assert json.load(f) == {"alpha": {"fast_verify": "fast"}, "beta": {"fast_verify": "fast"}}
+    assert os.listdir(tmp_path) == ["settings.json"]
+
+
+def test_settings_rejects_unknown_values(tmp_path):
+    store = ProjectSettingsStore(str(tmp_path / "settings.json"), defaults={"fast_verify": "off"})
+    with pytest.raises(ValueError):
+        store.update("project", {"fast_verify": "always"})
+    with pytest.raises(ValueError):
+        store.update("project", {"unknown": True})
+
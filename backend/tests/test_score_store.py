@@ -0,0 +1,71 @@
+import json
+import threading
+
+import pytest
+
+from score_store import JsonScoreStore, SqliteScoreStore, create_score_store
+
+
+def run_concurrently(target, count):
+    threads = [threading.Thread(target=target, args=(index,)) for index in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def test_sqlite_concurrent_increments_lose_no_updates(tmp_path):
+    store = SqliteScoreStore(str(tmp_path / "scores.sqlite3"))
+
+    def worker(index):
+        for _ in range(25):
+            store.increment("project", {"GPT": 1, "Gemini": 2})
+
+    run_concurrently(worker, 8)
+    assert store.increment("project", {}) == {"GPT": 200, "Gemini": 400}
+
+
+def test_sqlite_increments_from_separate_stores_lose_no_updates(tmp_path):
+    # 워커 프로세스마다 저장소 객체가 따로 있는 경우와 같이, 같은 파일을 여러 연결이 동시에 갱신합니다.
+    path = str(tmp_path / "scores.sqlite3")
+    stores = [SqliteScoreStore(path, read_cache_ttl=0) for _ in range(4)]
+
+    def worker(index):
+        for _ in range(25):
+            stores[index].increment("project", {"GPT": 1})
+
+    run_concurrently(worker, len(stores))
+    assert SqliteScoreStore(path, read_cache_ttl=0).get("project") == {"GPT": 100, "Gemini": 0}
+
+
+def test_json_concurrent_increments_lose_no_updates(tmp_path):
+    store = JsonScoreStore(str(tmp_path / "scores.json"))
+
+    def worker(index):
+        for _ in range(10):
+            store.increment("project", {"Gemini": 1})
+
+    run_concurrently(worker, 4)
+    assert store.get("project") == {"GPT": 0, "Gemini": 40}
+
+
+def test_migrate_json_runs_once(tmp_path, capsys):
+    json_path = tmp_path / "project_db.json"
+    json_path.write_text(json.dumps({"demo": {"GPT": 3, "Gemini": 5}}), encoding="utf-8")
+    sqlite_path = str(tmp_path / "scores.sqlite3")
+
+    SqliteScoreStore(sqlite_path, migrate_from=str(json_path))
+    store = SqliteScoreStore(sqlite_path, migrate_from=str(json_path), read_cache_ttl=0)
+
+    assert store.get("demo") == {"GPT": 3, "Gemini": 5}
+    assert capsys.readouterr().out.count("Migrated 1 projects") == 1
+
+
+def test_get_unknown_project_returns_zero_scores(tmp_path):
+    store = SqliteScoreStore(str(tmp_path / "scores.sqlite3"))
+    assert store.get("missing") == {"GPT": 0, "Gemini": 0}
+
+
+def test_create_score_store_rejects_unknown_backend(tmp_path):
+    with pytest.raises(ValueError):
+        create_score_store("redis", str(tmp_path / "a.json"), str(tmp_path / "a.sqlite3"))
@@ -0,0 +1,71 @@
+import threading
+import contextvars
+
+import pytest
+
+from stage_graph import StageGraph
+
+
+def test_stages_receive_dependency_results_in_order():
+    order = []
+    graph = StageGraph()
+    graph.add("a", lambda: order.append("a") or 1)
+    graph.add("b", lambda a: order.append("b") or a + 1, deps=["a"])
+    graph.add("c", lambda a, b: order.append("c") or a + b, deps=["a", "b"])
+
+    results, timings = graph.run(max_workers=4)
+
+    assert results == {"a": 1, "b": 2, "c": 3}
+    assert order == ["a", "b", "c"]
+    assert set(timings) == {"a", "b", "c", "total"}
+    assert timings["b"]["start"] >= timings["a"]["start"] + timings["a"]["duration"]
+
+
+def test_independent_stages_run_concurrently():
+    barrier = threading.Barrier(2, timeout=2)
+    graph = StageGraph()
+    # 두 단계가 동시에 실행되지 않으면 Barrier가 시간 초과로 BrokenBarrierError를 냅니다.
+    graph.add("left", lambda: barrier.wait() is not None)
+    graph.add("right", lambda: barrier.wait() is not None)
+    graph.add("join", lambda left, right: (left, right), deps=["left", "right"])
+
+    results, _ = graph.run(max_workers=2)
+    assert results["join"] == (True, True)
+
+
+def test_stage_error_propagates_and_skips_dependents():
+    ran = []
+    graph = StageGraph()
+    graph.add("fails", lambda: (_ for _ in ()).throw(KeyError("boom")))
+    graph.add("after", lambda fails: ran.append("after"), deps=["fails"])
+
+    with pytest.raises(KeyError, match="boom"):
+        graph.run()
+    assert ran == []
+
+
+def test_unknown_dependency_is_rejected_at_add():
+    graph = StageGraph()
+    with pytest.raises(ValueError, match="unknown stage 'missing'"):
+        graph.add("a", lambda missing: None, deps=["missing"])
+
+
+def test_dependency_cycle_is_reported_as_unresolvable():
+    graph = StageGraph()
+    graph.add("a", lambda: None)
+    graph.add("b", lambda a: None, deps=["a"])
+    # 같은 이름으로 다시 추가해 a가 b에 의존하도록 바꾸면 순환이 생깁니다.
+    graph.add("a", lambda b: None, deps=["b"])
+
+    with pytest.raises(RuntimeError, match="Unresolvable stage dependencies"):
+        graph.run()
+
+
+def test_stages_see_caller_context_variables():
+    request_id = contextvars.ContextVar("request_id")
+    request_id.set("req-1")
+    graph = StageGraph()
+    graph.add("read", lambda: request_id.get())
+
+    results, _ = graph.run()
+    assert results["read"] == "req-1"
@@ -0,0 +1,86 @@
+import json
+
+import pytest
+
+from metrics import registry
+from structured_output import (StructuredOutputError, openai_json_format, parse_json_object,
+                               request_structured, validate)
+
+SCHEMA = {
+    "type": "object",
+    "properties": {
+        "verdict": {"type": "string", "enum": ["correct", "incorrect"]},
+        "steps": {"type": "array", "items": {"type": "string"}},
+    },
+    "required": ["verdict"],
+}
+
+
+def error_count(stage):
+    return registry._counters.get(("gempt_structured_output_errors_total", (("stage", stage),)), 0)
+
+
+def scripted(*responses):
+    # 호출할 때마다 다음 응답을 반환하고, 호출 횟수를 calls에 기록하는 invoke 스텁입니다.
+    calls = []
+
+    def invoke():
+        calls.append(1)
+        return responses[len(calls) - 1]
+
+    return invoke, calls
+
+
+def test_validate_accepts_matching_object():
+    data = {"verdict": "correct", "steps": ["a", "b"], "extra": 1}
+    assert validate(data, SCHEMA) is data
+
+
+@pytest.mark.parametrize("data, message", [
+    ({}, "missing field 'verdict'"),
+    ({"verdict": "maybe"}, "'maybe' is not one of"),
+    ({"verdict": "correct", "steps": "a"}, r"\$.steps: expected array"),
+    ({"verdict": "correct", "steps": ["a", 1]}, r"\$.steps\[1\]: expected string"),
+    (["correct"], r"\$: expected object"),
+])
+def test_validate_rejects_mismatches(data, message):
+    with pytest.raises(StructuredOutputError, match=message):
+        validate(data, SCHEMA)
+
+
+def test_parse_json_object_strips_code_fence():
+    assert parse_json_object('```json\n{"verdict": "correct"}\n```') == {"verdict": "correct"}
+    with pytest.raises(StructuredOutputError):
+        parse_json_object("[1, 2]")
+
+
+def test_request_structured_returns_first_valid_response():
+    invoke, calls = scripted('{"verdict": "incorrect"}')
+    assert request_structured("test_first", invoke, SCHEMA) == ({"verdict": "incorrect"}, '{"verdict": "incorrect"}')
+    assert len(calls) == 1
+    assert error_count("test_first") == 0
+
+
+def test_request_structured_retries_once_after_invalid_response():
+    invoke, calls = scripted("not json", '{"verdict": "correct"}')
+    data, text = request_structured("test_retry", invoke, SCHEMA)
+    assert data == {"verdict": "correct"}
+    assert len(calls) == 2
+    assert error_count("test_retry") == 1
+
+
+def test_request_structured_gives_up_after_second_invalid_response():
+    invoke, calls = scripted('{"verdict": "maybe"}', "따라서 모델 01의 답변이 올바릅니다.", '{"verdict": "correct"}')
+    data, text = request_structured("test_give_up", invoke, SCHEMA)
+    # 세 번째 응답은 요청하지 않고, 마지막(두 번째) 응답 텍스트를 그대로 돌려줍니다.
+    assert (data, text) == (None, "따라서 모델 01의 답변이 올바릅니다.")
+    assert len(calls) == 2
+    assert error_count("test_give_up") == 2
+
+
+def test_openai_json_format_makes_every_object_strict():
+    schema = openai_json_format("verification", SCHEMA)["json_schema"]["schema"]
+    assert schema["required"] == ["verdict", "steps"]
+    assert schema["additionalProperties"] is False
+    assert SCHEMA["required"] == ["verdict"]  # 원본 스키마는 바뀌지 않습니다.
+    json.dumps(schema)
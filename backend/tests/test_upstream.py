@@ -0,0 +1,220 @@
+import threading
+import time
+import types
+
+import pytest
+
+from metrics import registry, track
+from upstream import (TokenBucket, UpstreamScheduler, UpstreamUnavailableError, is_retryable,
+                      parse_rate_limit, request_key)
+
+
+class RateLimitError(Exception):
+    status_code = 429
+
+    def __init__(self, message="rate limited", retry_after=None):
+        super().__init__(message)
+        headers = {"retry-after": str(retry_after)} if retry_after is not None else {}
+        self.response = types.SimpleNamespace(headers=headers)
+
+
+def make_scheduler(rate=0, deadline=5.0, max_retries=3):
+    return UpstreamScheduler({"test": (rate, max(1.0, rate))}, {"test": deadline},
+                             max_retries=max_retries, backoff_base=0.001, backoff_max=0.01)
+
+
+def counter(name, **labels):
+    return registry._counters.get((name, tuple(sorted(labels.items()))), 0)
+
+
+def test_parse_rate_limit_and_retryable_errors():
+    assert parse_rate_limit("8:16") == (8.0, 16.0)
+    assert parse_rate_limit("0") == (0.0, 1.0)
+    assert is_retryable(RateLimitError())
+    assert is_retryable(ConnectionError())
+    assert not is_retryable(ValueError())
+
+
+def test_request_key_distinguishes_payloads():
+    assert request_key("openai", {"a": 1, "b": [b"x"]}) == request_key("openai", {"b": [b"x"], "a": 1})
+    assert request_key("openai", b"image-1") != request_key("openai", b"image-2")
+
+
+def test_transient_errors_are_retried_until_success():
+    attempts = []
+
+    def flaky(timeout):
+        attempts.append(timeout)
+        if len(attempts) < 3:
+            raise RateLimitError()
+        return "ok"
+
+    assert make_scheduler().call("test", flaky) == "ok"
+    assert len(attempts) == 3
+
+
+def test_retry_limit_raises_upstream_unavailable():
+    attempts = []
+
+    def always_limited(timeout):
+        attempts.append(1)
+        raise RateLimitError()
+
+    failures = counter("gempt_upstream_failures_total", provider="test", reason="retries_exhausted")
+    with pytest.raises(UpstreamUnavailableError) as error:
+        make_scheduler(max_retries=2).call("test", always_limited)
+    assert error.value.provider == "test"
+    assert isinstance(error.value.__cause__, RateLimitError)
+    assert len(attempts) == 3  # 첫 시도 + 재시도 2번
+    assert counter("gempt_upstream_failures_total", provider="test", reason="retries_exhausted") == failures + 1
+
+
+def test_non_retryable_errors_are_raised_immediately():
+    attempts = []
+
+    def bad_request(timeout):
+        attempts.append(1)
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        make_scheduler().call("test", bad_request)
+    assert len(attempts) == 1
+
+
+def test_retry_after_beyond_deadline_stops_retrying():
+    attempts = []
+
+    def limited(timeout):
+        attempts.append(1)
+        raise RateLimitError(retry_after=30)
+
+    started = time.monotonic()
+    with pytest.raises(UpstreamUnavailableError) as error:
+        make_scheduler(deadline=1.0).call("test", limited)
+    assert len(attempts) == 1
+    assert error.value.retry_after == 30
+    assert time.monotonic() - started < 0.5
+
+
+def test_fn_receives_remaining_time_before_deadline():
+    timeouts = []
+    make_scheduler(deadline=2.0).call("test", lambda timeout: timeouts.append(timeout))
+    assert 0 < timeouts[0] <= 2.0
+
+
+def test_rate_limit_wait_beyond_deadline_raises():
+    scheduler = make_scheduler(rate=1, deadline=0.2)
+    scheduler.call("test", lambda timeout: "first")
+    # 버킷이 비어 다음 토큰까지 약 1초를 기다려야 하므로 마감 시간(0.2초) 안에 호출할 수 없습니다.
+    with pytest.raises(UpstreamUnavailableError, match="rate limit"):
+        scheduler.call("test", lambda timeout: "second")
+
+
+def test_token_bucket_allows_burst_then_waits():
+    bucket = TokenBucket(rate=100, burst=2)
+    deadline = time.monotonic() + 1
+    assert bucket.acquire(deadline) and bucket.acquire(deadline)
+    started = time.monotonic()
+    assert bucket.acquire(deadline)
+    assert time.monotonic() - started >= 0.005
+
+
+def run_coalesced(scheduler, fn, followers):
+    # 선행 호출이 fn 안에서 멈춰 있는 동안 같은 key로 followers개의 호출을 추가로 보냅니다.
+    outcomes = []
+    lock = threading.Lock()
+
+    def caller():
+        try:
+            outcome = ("result", scheduler.call("test", fn, key="same"))
+        except Exception as e:
+            outcome = ("error", e)
+        with lock:
+            outcomes.append(outcome)
+
+    before = counter("gempt_upstream_coalesced_total", provider="test")
+    threads = [threading.Thread(target=caller) for _ in range(followers + 1)]
+    for thread in threads:
+        thread.start()
+    return threads, outcomes, before
+
+
+def wait_for_followers(before, followers):
+    deadline = time.monotonic() + 2
+    while counter("gempt_upstream_coalesced_total", provider="test") < before + followers:
+        assert time.monotonic() < deadline, "followers did not join the in-flight call"
+        time.sleep(0.005)
+
+
+def test_identical_in_flight_calls_share_one_upstream_call():
+    release = threading.Event()
+    calls = []
+
+    def slow(timeout):
+        calls.append(1)
+        release.wait(2)
+        return "shared"
+
+    threads, outcomes, before = run_coalesced(make_scheduler(), slow, followers=3)
+    wait_for_followers(before, 3)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert outcomes == [("result", "shared")] * 4
+
+
+def test_in_flight_exception_is_raised_in_every_merged_caller():
+    release = threading.Event()
+
+    def failing(timeout):
+        release.wait(2)
+        raise ValueError("upstream rejected the request")
+
+    threads, outcomes, before = run_coalesced(make_scheduler(), failing, followers=2)
+    wait_for_followers(before, 2)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert len(outcomes) == 3
+    assert all(kind == "error" and isinstance(error, ValueError) for kind, error in outcomes)
+
+
+def test_shared_response_usage_is_recorded_once():
+    release = threading.Event()
+    usage = types.SimpleNamespace(prompt_tokens=100, completion_tokens=10)
+    response = types.SimpleNamespace(usage=usage)
+    records = []
+    scheduler = make_scheduler()
+
+    def slow(timeout):
+        release.wait(2)
+        return response
+
+    def caller():
+        with track("coalesce_test", "openai", "gpt-4o") as call:
+            call.record_usage(scheduler.call("test", slow, key="usage"))
+        records.append(call)
+
+    before = counter("gempt_upstream_coalesced_total", provider="test")
+    threads = [threading.Thread(target=caller) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    wait_for_followers(before, 2)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(record.prompt_tokens for record in records) == [0, 0, 100]
+    assert sum(1 for record in records if record.details.get("coalesced")) == 2
+    costs = sorted(record.cost for record in records)
+    assert costs[:2] == [0.0, 0.0] and costs[2] > 0
+
+
+def test_shared_flag_is_cleared_by_the_next_call():
+    scheduler = make_scheduler()
+    response = types.SimpleNamespace(usage=types.SimpleNamespace(prompt_tokens=5, completion_tokens=1))
+    with track("coalesce_test", "openai", "gpt-4o") as call:
+        call.record_usage(scheduler.call("test", lambda timeout: response, key="fresh"))
+    assert call.prompt_tokens == 5
+    assert "coalesced" not in call.details
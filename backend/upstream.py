@@ -0,0 +1,242 @@
+import json
+import time
+import random
+import hashlib
+import threading
+from types import SimpleNamespace
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+from metrics import mark_shared_response, registry
+
+# =======================================================
+# [업스트림 스케줄러] 프로바이더별 속도 제한, 재시도, 마감 시간, 동일 요청 합치기
+# =======================================================
+# 모든 OpenAI / Gemini / SerpAPI 호출은 ScheduledProviders를 거쳐 UpstreamScheduler.call()로 실행됩니다.
+# 1. 프로바이더별 토큰 버킷으로 초당 요청 수를 제한합니다. (429 응답을 받기 전에 미리 속도를 늦춤)
+# 2. 429/5xx/연결 오류는 지터를 넣은 지수 백오프로 재시도합니다. Retry-After 헤더가 있으면 그 이상 기다립니다.
+# 3. 호출마다 마감 시간을 두고, 재시도와 대기를 포함해 마감 시간을 넘기면 UpstreamUnavailableError를 냅니다.
+# 4. 같은 요청(모델, 프롬프트, 이미지 바이트가 모두 동일)이 진행 중이면 새로 호출하지 않고 그 결과를 함께 받습니다.
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+# SDK마다 예외 계층이 달라 클래스 이름으로 일시적 오류를 구분합니다. (openai, google.api_core, requests)
+RETRYABLE_ERRORS = {
+    "RateLimitError", "APIConnectionError", "APITimeoutError", "InternalServerError",
+    "ResourceExhausted", "ServiceUnavailable", "DeadlineExceeded", "TooManyRequests",
+    "ConnectionError", "ConnectTimeout", "ReadTimeout", "Timeout",
+}
+
+
+class UpstreamUnavailableError(Exception):
+    # 재시도를 모두 소진했거나 마감 시간 안에 응답을 받지 못한 경우입니다.
+    def __init__(self, provider, message, retry_after=None):
+        super().__init__(f"{provider}: {message}")
+        self.provider = provider
+        self.retry_after = retry_after
+
+
+def parse_rate_limit(spec):
+    # "초당 요청 수[:버스트]" 형식입니다. (예: "8:16") 0이면 속도를 제한하지 않습니다.
+    rate, _, burst = spec.partition(":")
+    rate = float(rate)
+    return rate, float(burst) if burst else max(1.0, rate)
+
+
+def is_retryable(error):
+    status = getattr(error, "status_code", None) or getattr(error, "code", None)
+    if isinstance(status, int) and status in RETRYABLE_STATUS:
+        return True
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    return any(cls.__name__ in RETRYABLE_ERRORS for cls in type(error).__mro__)
+
+
+def retry_after_seconds(error):
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def request_key(*parts):
+    # 요청 인자(문자열, 바이트, dict, list)를 순서대로 해시해 동일 요청을 식별합니다.
+    digest = hashlib.sha256()
+
+    def feed(value):
+        if isinstance(value, bytes):
+            digest.update(b"b%d:" % len(value))
+            digest.update(value)
+        elif isinstance(value, str):
+            encoded = value.encode("utf-8")
+            digest.update(b"s%d:" % len(encoded))
+            digest.update(encoded)
+        elif isinstance(value, dict):
+            digest.update(b"{")
+            for key in sorted(value, key=str):
+                feed(str(key))
+                feed(value[key])
+            digest.update(b"}")
+        elif isinstance(value, (list, tuple)):
+            digest.update(b"[")
+            for item in value:
+                feed(item)
+            digest.update(b"]")
+        else:
+            feed(json.dumps(value, sort_keys=True, default=repr))
+
+    for part in parts:
+        feed(part)
+    return digest.hexdigest()
+
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, deadline):
+        # 토큰 하나를 얻을 때까지 기다립니다. deadline(time.monotonic 기준)까지 얻지 못하면 False를 반환합니다.
+        if self.rate <= 0:
+            return True
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+class UpstreamScheduler:
+    def __init__(self, rate_limits, deadlines, max_retries=3, backoff_base=0.5, backoff_max=8.0):
+        # rate_limits: {provider: (초당 요청 수, 버스트)}, deadlines: {provider: 호출당 마감 시간(초)}
+        self.buckets = {provider: TokenBucket(rate, burst) for provider, (rate, burst) in rate_limits.items()}
+        self.deadlines = dict(deadlines)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._random = random.Random()
+
+    def call(self, provider, fn, key=None, timeout=None):
+        # fn(timeout)은 남은 시간(초)을 받아 업스트림을 한 번 호출하는 함수입니다.
+        # 다른 요청의 호출 결과를 함께 받으면 metrics.mark_shared_response(True)로 표시해 토큰/비용이 두 번 집계되지 않게 합니다.
+        mark_shared_response(False)
+        deadline = time.monotonic() + (timeout or self.deadlines.get(provider, 120.0))
+        if key is None:
+            return self._call_with_retry(provider, fn, deadline)
+
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+        if not leader:
+            registry.increment("gempt_upstream_coalesced_total", {"provider": provider})
+            try:
+                result = future.result(timeout=max(0.0, deadline - time.monotonic()))
+            except FutureTimeoutError:
+                raise UpstreamUnavailableError(provider, "identical in-flight request did not finish before the deadline")
+            mark_shared_response(True)
+            return result
+
+        try:
+            result = self._call_with_retry(provider, fn, deadline)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _call_with_retry(self, provider, fn, deadline):
+        bucket = self.buckets.get(provider)
+        attempt = 0
+        while True:
+            if bucket is not None and not bucket.acquire(deadline):
+                registry.increment("gempt_upstream_failures_total", {"provider": provider, "reason": "rate_limit"})
+                raise UpstreamUnavailableError(provider, "rate limit wait exceeded the call deadline")
+            try:
+                return fn(max(0.1, deadline - time.monotonic()))
+            except Exception as e:
+                if not is_retryable(e):
+                    raise
+                retry_after = retry_after_seconds(e)
+                # 전체 지터(full jitter): 0 ~ min(최대값, 기본값 * 2^시도) 사이에서 무작위로 기다립니다.
+                delay = self._random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+                delay = max(delay, retry_after or 0.0)
+                if attempt >= self.max_retries or time.monotonic() + delay >= deadline:
+                    registry.increment("gempt_upstream_failures_total", {"provider": provider, "reason": "retries_exhausted"})
+                    raise UpstreamUnavailableError(provider, f"{type(e).__name__}: {e}", retry_after=retry_after) from e
+                attempt += 1
+                registry.increment("gempt_upstream_retries_total", {"provider": provider})
+                print(f"Retrying {provider} call in {delay:.2f}s (attempt {attempt}/{self.max_retries}): {e}")
+                time.sleep(delay)
+
+
+# =======================================================
+# [프로바이더 래퍼] 기존 Providers 인터페이스를 그대로 유지하면서 스케줄러를 거치게 합니다.
+# =======================================================
+class ScheduledChatCompletions:
+    def __init__(self, completions, scheduler):
+        self.completions = completions
+        self.scheduler = scheduler
+
+    def create(self, **kwargs):
+        return self.scheduler.call(
+            "openai",
+            lambda timeout: self.completions.create(**kwargs, timeout=timeout),
+            key=request_key("openai", kwargs),
+        )
+
+
+class ScheduledGeminiModel:
+    def __init__(self, model, model_name, scheduler):
+        self.model = model
+        self.model_name = model_name
+        self.scheduler = scheduler
+
+    def generate_content(self, contents, **kwargs):
+        return self.scheduler.call(
+            "gemini",
+            lambda timeout: self.model.generate_content(contents, **kwargs, request_options={"timeout": timeout}),
+            key=request_key("gemini", self.model_name, contents, kwargs),
+        )
+
+
+class ScheduledProviders:
+    # providers.Providers(또는 같은 인터페이스의 스텁)를 감싸 모든 업스트림 호출이 스케줄러를 거치게 합니다.
+    def __init__(self, providers, scheduler):
+        self.providers = providers
+        self.scheduler = scheduler
+        self.openai = SimpleNamespace(chat=SimpleNamespace(
+            completions=ScheduledChatCompletions(providers.openai.chat.completions, scheduler)))
+        self._gemini_models = {}
+        self._lock = threading.Lock()
+
+    def gemini(self, model_name):
+        with self._lock:
+            model = self._gemini_models.get(model_name)
+            if model is None:
+                model = ScheduledGeminiModel(self.providers.gemini(model_name), model_name, self.scheduler)
+                self._gemini_models[model_name] = model
+            return model
+
+    def google_search(self, query, timeout):
+        return self.scheduler.call(
+            "serpapi",
+            lambda remaining: self.providers.google_search(query, timeout=remaining),
+            key=request_key("serpapi", query),
+            timeout=timeout,
+        )
@@ -0,0 +1,9 @@
+from app import create_app
+
+# =======================================================
+# [운영 서버 진입점] gunicorn / uvicorn
+# =======================================================
+# backend 디렉토리에서 실행합니다:
+#   gunicorn -c gunicorn.conf.py wsgi:application
+#   uvicorn --interface wsgi --host 0.0.0.0 --port 5000 --workers 1 wsgi:application
+application = create_app()